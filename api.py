@@ -1,10 +1,13 @@
 # api.py
+import json
 from flask import Blueprint, jsonify, request, current_app
 from flask.views import MethodView
 from datamanager.sqlite_data_manager import SQLiteDataManager
+from datamanager.analytics import ReviewAnalytics
 
 api_bp = Blueprint('api', __name__)
 data_manager = None
+analytics = None
 
 
 @api_bp.record
@@ -13,9 +16,10 @@ def record_params(setup_state):
     This function runs when the blueprint is registered
     and gives us access to the app object
     """
-    global data_manager
+    global data_manager, analytics
     app = setup_state.app
     data_manager = app.config.get('data_manager')
+    analytics = ReviewAnalytics(data_manager) if data_manager else None
 
 
 class UsersAPI(MethodView):
@@ -163,22 +167,43 @@ class MoviesAPI(MethodView):
         except Exception as e:
             return jsonify({'status': 'error', 'message': str(e)}), 500
 
-    def delete(self, user_id, movie_id):
-        """Delete a movie"""
-        # Check if movie exists and belongs to user
-        movie = data_manager.Movie.query.get(movie_id)
-        if not movie or movie.user_id != user_id:
-            return jsonify({'status': 'error', 'message': 'Movie not found for this user'}), 404
+    def delete(self, user_id, movie_id=None):
+        """Delete a movie, or several of a user's movies at once"""
+        if movie_id is None:
+            return self._delete_many(user_id)
 
         try:
-            result = data_manager.delete_movie(movie_id)
-            if result:
-                return jsonify({
-                    'status': 'success',
-                    'message': 'Movie deleted successfully'
-                })
-            else:
-                return jsonify({'status': 'error', 'message': 'Failed to delete movie'}), 500
+            # Only a movie in the user's library (one they reviewed) is deleted
+            if not data_manager.delete_user_movies(user_id, [movie_id]):
+                return jsonify({'status': 'error', 'message': 'Movie not found for this user'}), 404
+            return jsonify({
+                'status': 'success',
+                'message': 'Movie deleted successfully'
+            })
+        except Exception as e:
+            return jsonify({'status': 'error', 'message': str(e)}), 500
+
+    def _delete_many(self, user_id):
+        """Delete the movies listed in ?ids=1,2,3, or the user's whole library if omitted"""
+        user = data_manager.User.query.get(user_id)
+        if not user:
+            return jsonify({'status': 'error', 'message': 'User not found'}), 404
+
+        ids_param = request.args.get('ids')
+        movie_ids = None
+        if ids_param is not None:
+            try:
+                movie_ids = [int(movie_id) for movie_id in ids_param.split(',') if movie_id.strip()]
+            except ValueError:
+                return jsonify({'status': 'error', 'message': 'ids must be a comma-separated list of integers'}), 400
+
+        try:
+            deleted = data_manager.delete_user_movies(user_id, movie_ids)
+            return jsonify({
+                'status': 'success',
+                'message': f'{deleted} movie(s) deleted successfully',
+                'data': {'deleted': deleted}
+            })
         except Exception as e:
             return jsonify({'status': 'error', 'message': str(e)}), 500
 
@@ -318,6 +343,81 @@ class ReviewsAPI(MethodView):
             return jsonify({'status': 'error', 'message': str(e)}), 500
 
 
+class ChangesAPI(MethodView):
+    MAX_LIMIT = 1000
+
+    def get(self):
+        """Get changes recorded after a sequence number, oldest first"""
+        try:
+            since = int(request.args.get('since', 0))
+            limit = int(request.args.get('limit', 100))
+        except ValueError:
+            return jsonify({'status': 'error', 'message': 'since and limit must be integers'}), 400
+
+        if since < 0 or limit < 1:
+            return jsonify({'status': 'error', 'message': 'since must be >= 0 and limit must be >= 1'}), 400
+        limit = min(limit, self.MAX_LIMIT)
+
+        # Fetch one extra row to tell the client whether to keep paging
+        changes = data_manager.get_changes(since, limit + 1)
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+
+        return jsonify({
+            'status': 'success',
+            'data': {
+                'changes': [{
+                    'seq': change.seq,
+                    'entity': change.entity,
+                    'entity_id': change.entity_id,
+                    'op': change.op,
+                    'data': json.loads(change.data) if change.data else None,
+                    'created_at': str(change.created_at)
+                } for change in changes],
+                'next_since': changes[-1].seq if changes else since,
+                'has_more': has_more
+            }
+        })
+
+
+class StatsAPI(MethodView):
+    def get(self, user_id=None):
+        """Get rating rollups for all reviews or for one user's reviews"""
+        if user_id is not None:
+            user = data_manager.User.query.get(user_id)
+            if not user:
+                return jsonify({'status': 'error', 'message': 'User not found'}), 404
+
+        try:
+            return jsonify({'status': 'success', 'data': analytics.get_stats(user_id)})
+        except Exception as e:
+            return jsonify({'status': 'error', 'message': str(e)}), 500
+
+
+class QueryProfileAPI(MethodView):
+    def get(self):
+        """Get the slowest statements recorded by the query profiler"""
+        if not data_manager.profiler:
+            return jsonify({'status': 'error', 'message': 'Query profiling is disabled'}), 404
+
+        order_by = request.args.get('order_by', 'total')
+        try:
+            limit = int(request.args.get('limit', 20))
+            report = data_manager.profiler.report(order_by=order_by, limit=limit)
+        except ValueError as e:
+            return jsonify({'status': 'error', 'message': str(e)}), 400
+
+        return jsonify({'status': 'success', 'data': report})
+
+    def delete(self):
+        """Reset the query profiler statistics"""
+        if not data_manager.profiler:
+            return jsonify({'status': 'error', 'message': 'Query profiling is disabled'}), 404
+
+        data_manager.profiler.reset()
+        return jsonify({'status': 'success', 'message': 'Query profile reset'})
+
+
 # Register the Users API endpoints
 users_view = UsersAPI.as_view('users_api')
 api_bp.add_url_rule('/users', view_func=users_view, methods=['GET', 'POST'])
@@ -325,11 +425,24 @@ api_bp.add_url_rule('/users/<int:user_id>', view_func=users_view, methods=['GET'
 
 # Register the Movies API endpoints
 movies_view = MoviesAPI.as_view('movies_api')
-api_bp.add_url_rule('/users/<int:user_id>/movies', view_func=movies_view, methods=['GET', 'POST'])
+api_bp.add_url_rule('/users/<int:user_id>/movies', view_func=movies_view, methods=['GET', 'POST', 'DELETE'])
 api_bp.add_url_rule('/users/<int:user_id>/movies/<int:movie_id>', view_func=movies_view,
                     methods=['GET', 'PUT', 'DELETE'])
 
 # Register the Reviews API endpoints
 reviews_view = ReviewsAPI.as_view('reviews_api')
 api_bp.add_url_rule('/movies/<int:movie_id>/reviews', view_func=reviews_view, methods=['GET', 'POST'])
-api_bp.add_url_rule('/reviews/<int:review_id>', view_func=reviews_view, methods=['GET', 'PUT', 'DELETE'])
\ No newline at end of file
+api_bp.add_url_rule('/reviews/<int:review_id>', view_func=reviews_view, methods=['GET', 'PUT', 'DELETE'])
+
+# Register the change feed endpoint
+changes_view = ChangesAPI.as_view('changes_api')
+api_bp.add_url_rule('/changes', view_func=changes_view, methods=['GET'])
+
+# Register the analytics endpoints
+stats_view = StatsAPI.as_view('stats_api')
+api_bp.add_url_rule('/stats', view_func=stats_view, methods=['GET'])
+api_bp.add_url_rule('/users/<int:user_id>/stats', view_func=stats_view, methods=['GET'])
+
+# Register the query profiler report endpoint
+profile_view = QueryProfileAPI.as_view('query_profile_api')
+api_bp.add_url_rule('/profile/queries', view_func=profile_view, methods=['GET', 'DELETE'])
@@ -3,16 +3,47 @@ import requests
 import os
 import datetime
 from datamanager.sqlite_data_manager import SQLiteDataManager
+from datamanager.caching_data_manager import CachingDataManager
+from datamanager.title_index import TitleIndex, build_index
+from assets import init_assets, init_compression
+from template_cache import init_template_cache
+from api import api_bp
 app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///movieweb.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv("DATABASE_URI", 'sqlite:///movieweb.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['QUERY_PROFILING'] = os.getenv("QUERY_PROFILING") == "1"
+app.config['GROUP_COMMIT'] = os.getenv("GROUP_COMMIT") == "1"
 app.secret_key = os.urandom(24)  # Secure secret key
 
 # Initialize data manager after app configuration
 data_manager = SQLiteDataManager(app)
+if os.getenv("HOT_TIER") == "1":
+    # Serve hot users' and movies' reads from memory
+    data_manager = CachingDataManager(data_manager)
+
+# Expose the JSON API under /api
+app.config['data_manager'] = data_manager
+app.register_blueprint(api_bp, url_prefix='/api')
+
+# Fingerprinted, precompressed static files and gzip for large HTML/JSON responses
+init_assets(app)
+init_compression(app)
+
+# Compiled templates are cached on disk under instance/jinja_cache/
+init_template_cache(app)
 
 OMDB_API_KEY = os.getenv("OMDB_API_KEY")
 
+# Optional local metadata dump used to resolve titles before asking OMDb
+MOVIE_INDEX_PATH = os.getenv("MOVIE_INDEX_PATH")
+title_index = None
+if MOVIE_INDEX_PATH:
+    try:
+        title_index = TitleIndex.open(MOVIE_INDEX_PATH)
+    except (OSError, ValueError) as e:
+        # The index is built ahead of time with `flask build-title-index`
+        print(f"Title index unavailable, using OMDb only: {e}")
+
 
 def get_movie_data_from_omdb(movie_name):
     url = f"http://www.omdbapi.com/?t={movie_name}&apikey={OMDB_API_KEY}"
@@ -29,6 +60,15 @@ def get_movie_data_from_omdb(movie_name):
         return None
 
 
+def get_movie_data(movie_name):
+    """Resolve a title from the local index first, falling back to OMDb on a miss"""
+    if title_index:
+        movie_data = title_index.lookup(movie_name)
+        if movie_data:
+            return movie_data
+    return get_movie_data_from_omdb(movie_name)
+
+
 @app.context_processor
 def inject_globals():
     return {
@@ -81,7 +121,7 @@ def add_movie(user_id):
             flash('Movie name cannot be empty!', 'error')
             return render_template('add_movie.html', user=user)
 
-        movie_data = get_movie_data_from_omdb(movie_name)
+        movie_data = get_movie_data(movie_name)
         if movie_data:
             name = movie_data.get('Title')
             director = movie_data.get('Director', 'Unknown')
@@ -218,6 +258,24 @@ def delete_review(review_id):
     return redirect(url_for('movie_details', user_id=user_id, movie_id=movie_id))
 
 
+@app.cli.command('build-title-index')
+def build_title_index():
+    """Build the trigram index for the MOVIE_INDEX_PATH dump."""
+    if not MOVIE_INDEX_PATH:
+        print("MOVIE_INDEX_PATH is not set.")
+        return
+    build_index(MOVIE_INDEX_PATH, f'{MOVIE_INDEX_PATH}.idx')
+    with TitleIndex(MOVIE_INDEX_PATH) as index:
+        print(f"Indexed {len(index)} titles into {index.index_path}.")
+
+
+@app.cli.command('compact-changes')
+def compact_changes():
+    """Drop superseded change log entries, keeping the newest per entity."""
+    removed = data_manager.compact_changes()
+    print(f"Removed {removed} superseded change(s).")
+
+
 @app.errorhandler(404)
 def page_not_found(e):
     return render_template('404.html'), 404
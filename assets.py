@@ -0,0 +1,182 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import tempfile
+import zlib
+from flask import request, send_from_directory
+
+try:
+    import brotli
+except ImportError:  # Brotli variants are optional; gzip is always built
+    brotli = None
+
+# Fingerprinted copies and their compressed variants live under static/dist/
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+ONE_YEAR = 365 * 24 * 60 * 60
+
+PRECOMPRESS_SUFFIXES = ('.css', '.js', '.svg', '.html', '.json', '.txt', '.map')
+# Preferred first; each entry is (Accept-Encoding token, file suffix)
+STATIC_ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+COMPRESS_MIMETYPES = ('text/html', 'application/json')
+COMPRESS_MIN_SIZE = 1024
+COMPRESS_LEVEL = 6
+
+
+def _source_files(static_folder):
+    """Yield static file paths relative to the static folder, skipping build output"""
+    for root, dirs, files in os.walk(static_folder):
+        if root == static_folder and DIST_DIR in dirs:
+            dirs.remove(DIST_DIR)
+        for name in files:
+            yield os.path.relpath(os.path.join(root, name), static_folder).replace(os.sep, '/')
+
+
+def _write_atomic(path, data):
+    # A private temp file, so workers building at the same time never share one
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + '.', dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(data)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def build_assets(static_folder):
+    """
+    Fingerprint every static file and precompress the text ones.
+
+    Returns the manifest, which maps each original filename to its
+    fingerprinted path relative to the static folder.
+    """
+    manifest = {}
+    for filename in _source_files(static_folder):
+        with open(os.path.join(static_folder, filename), 'rb') as file:
+            data = file.read()
+
+        stem, ext = os.path.splitext(filename)
+        digest = hashlib.sha256(data).hexdigest()[:12]
+        hashed_name = f'{DIST_DIR}/{stem}.{digest}{ext}'
+        hashed_path = os.path.join(static_folder, hashed_name)
+        manifest[filename] = hashed_name
+
+        # Content-addressed, so an existing file is already up to date
+        if os.path.exists(hashed_path):
+            continue
+        os.makedirs(os.path.dirname(hashed_path), exist_ok=True)
+        if ext in PRECOMPRESS_SUFFIXES:
+            _write_atomic(f'{hashed_path}.gz', gzip.compress(data, compresslevel=9, mtime=0))
+            if brotli:
+                _write_atomic(f'{hashed_path}.br', brotli.compress(data, quality=11))
+        _write_atomic(hashed_path, data)
+
+    _write_atomic(os.path.join(static_folder, DIST_DIR, MANIFEST_NAME),
+                  json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    return manifest
+
+
+def load_manifest(static_folder):
+    """Load the asset manifest, rebuilding it if any static file is newer"""
+    manifest_path = os.path.join(static_folder, DIST_DIR, MANIFEST_NAME)
+    if os.path.exists(manifest_path):
+        built_at = os.path.getmtime(manifest_path)
+        if all(os.path.getmtime(os.path.join(static_folder, filename)) <= built_at
+               for filename in _source_files(static_folder)):
+            with open(manifest_path, encoding='utf-8') as file:
+                return json.load(file)
+    return build_assets(static_folder)
+
+
+def init_assets(app):
+    """Serve fingerprinted, precompressed static files and point url_for('static') at them"""
+    os.makedirs(os.path.join(app.static_folder, DIST_DIR), exist_ok=True)
+    manifest = load_manifest(app.static_folder)
+    fingerprinted = set(manifest.values())
+
+    @app.url_defaults
+    def fingerprint_static_url(endpoint, values):
+        # In debug mode keep plain names so edited files show up on reload
+        if endpoint == 'static' and not app.debug and 'filename' in values:
+            values['filename'] = manifest.get(values['filename'], values['filename'])
+
+    def static(filename):
+        if filename not in fingerprinted:
+            return app.send_static_file(filename)
+
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        encoding = None
+        path = filename
+        for token, suffix in STATIC_ENCODINGS:
+            if (request.accept_encodings[token]
+                    and os.path.isfile(os.path.join(app.static_folder, filename + suffix))):
+                encoding = token
+                path = filename + suffix
+                break
+
+        response = send_from_directory(app.static_folder, path, mimetype=mimetype, max_age=ONE_YEAR)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+    app.view_functions['static'] = static
+
+    @app.cli.command('build-assets')
+    def build_assets_command():
+        """Fingerprint and precompress static files."""
+        built = build_assets(app.static_folder)
+        print(f"Built {len(built)} asset(s) in {os.path.join(app.static_folder, DIST_DIR)}.")
+
+    return manifest
+
+
+def _gzip_chunks(chunks):
+    compressor = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        if chunk:
+            # Sync-flush so each chunk reaches the client as soon as it is produced
+            yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+def init_compression(app):
+    """Gzip large HTML and JSON responses for clients that accept it, streaming if the response streams"""
+
+    @app.after_request
+    def compress_response(response):
+        if (response.mimetype not in COMPRESS_MIMETYPES
+                or response.status_code < 200 or response.status_code in (204, 304)
+                or 'Content-Encoding' in response.headers
+                or response.direct_passthrough):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        if not request.accept_encodings['gzip']:
+            return response
+
+        if response.is_streamed:
+            chunks = response.response
+            if hasattr(chunks, 'close'):
+                response.call_on_close(chunks.close)
+            response.response = _gzip_chunks(chunks)
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < COMPRESS_MIN_SIZE:
+                return response
+            response.set_data(gzip.compress(data, compresslevel=COMPRESS_LEVEL))
+
+        response.headers['Content-Encoding'] = 'gzip'
+        return response
+
@@ -0,0 +1,71 @@
+"""
+Compare review writes/sec with per-request commits and with group commit.
+
+Run from the repository root:
+
+    python -m benchmarks.group_commit --threads 8 --writes 200
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from flask import Flask
+from datamanager.sqlite_data_manager import SQLiteDataManager
+
+
+def run(db_path, group_commit, threads, writes):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['GROUP_COMMIT'] = group_commit
+    data_manager = SQLiteDataManager(app)
+
+    with app.app_context():
+        user = data_manager.add_user('benchmark')
+        movie = data_manager.add_movie(user.id, 'Benchmark', None, None, 5)
+        user_id, movie_id = user.id, movie.id
+
+    errors = []
+
+    def worker():
+        # Each thread stands in for one request handler
+        with app.app_context():
+            for i in range(writes):
+                try:
+                    data_manager.add_review(user_id, movie_id, f'Review {i}', i % 10)
+                except Exception as e:
+                    errors.append(e)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    if data_manager.group_commit:
+        data_manager.group_commit.close()
+    with app.app_context():
+        data_manager.db.engine.dispose()
+
+    total = threads * writes
+    return (total - len(errors)) / elapsed, len(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--writes', type=int, default=200, help='writes per thread')
+    args = parser.parse_args()
+
+    print(f'{args.threads} threads x {args.writes} add_review calls')
+    for label, group_commit in (('per-request commit', False), ('group commit', True)):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            rate, errors = run(os.path.join(tmp_dir, 'bench.db'), group_commit, args.threads, args.writes)
+        print(f'{label:>20}: {rate:10.1f} writes/sec ({errors} errors)')
+
+
+if __name__ == '__main__':
+    main()
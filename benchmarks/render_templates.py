@@ -0,0 +1,70 @@
+"""
+Measure template compile time (cold vs. bytecode cache) and render time for the busiest pages.
+
+Run from the repository root:
+
+    python -m benchmarks.render_templates --rows 5000 --repeat 20
+"""
+import argparse
+import datetime
+import tempfile
+import time
+from types import SimpleNamespace
+from flask import render_template
+from jinja2 import FileSystemBytecodeCache
+from app import app
+
+
+def compile_all(bytecode_cache):
+    """Compile every template in a fresh environment, as a newly booted worker would"""
+    options = app.jinja_options
+    app.jinja_options = {**options, 'bytecode_cache': bytecode_cache}
+    try:
+        environment = app.create_jinja_environment()
+    finally:
+        app.jinja_options = options
+    names = environment.list_templates()
+    start = time.perf_counter()
+    for name in names:
+        environment.get_template(name)
+    return len(names), time.perf_counter() - start
+
+
+def render_time(template, repeat, **context):
+    with app.test_request_context():
+        render_template(template, **context)  # compile and warm up
+        start = time.perf_counter()
+        for _ in range(repeat):
+            html = render_template(template, **context)
+        return (time.perf_counter() - start) / repeat, len(html)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=5000, help='movies and reviews per page')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        count, cold = compile_all(None)
+        compile_all(FileSystemBytecodeCache(cache_dir))
+        _, warm = compile_all(FileSystemBytecodeCache(cache_dir))
+    print(f'Compile {count} templates: {cold * 1000:8.2f} ms cold, {warm * 1000:8.2f} ms from bytecode cache')
+
+    user = SimpleNamespace(id=1, username='benchmark')
+    movies = [SimpleNamespace(id=i, name=f'Movie {i}', director=f'Director {i % 100}',
+                              year=1950 + i % 70, rating=round(i % 100 / 10, 1))
+              for i in range(args.rows)]
+    created_at = datetime.datetime(2024, 1, 1)
+    reviews = [SimpleNamespace(id=i, user_id=1 + i % 2, rating=i % 11, text=f'Review text {i}',
+                               author=user, created_at=created_at)
+               for i in range(args.rows)]
+
+    seconds, size = render_time('user_movies.html', args.repeat, user=user, movies=movies)
+    print(f'user_movies.html   ({args.rows} movies):  {seconds * 1000:8.2f} ms/render, {size} bytes')
+    seconds, size = render_time('movie_details.html', args.repeat, user=user, movie=movies[0], reviews=reviews)
+    print(f'movie_details.html ({args.rows} reviews): {seconds * 1000:8.2f} ms/render, {size} bytes')
+
+
+if __name__ == '__main__':
+    main()
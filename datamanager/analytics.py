@@ -0,0 +1,234 @@
+import json
+import threading
+from datetime import datetime
+import numpy as np
+from sqlalchemy import select
+
+RATING_BINS = 11  # ratings are bucketed to whole numbers 0..10
+NO_VALUE = -1
+
+
+def _month_key(created_at):
+    """Encode a datetime (or its string form) as yyyymm, or NO_VALUE when unknown"""
+    if created_at is None:
+        return NO_VALUE
+    if isinstance(created_at, str):
+        created_at = datetime.fromisoformat(created_at)
+    return created_at.year * 100 + created_at.month
+
+
+def _grouped_average(keys, ratings):
+    """Vectorized mean rating and count per distinct key, ignoring NO_VALUE keys"""
+    known = keys != NO_VALUE
+    groups, inverse = np.unique(keys[known], return_inverse=True)
+    counts = np.bincount(inverse, minlength=len(groups))
+    sums = np.bincount(inverse, weights=ratings[known], minlength=len(groups))
+    return groups, sums / np.maximum(counts, 1), counts
+
+
+class ReviewAnalytics:
+    """
+    Rating rollups over a columnar, in-memory extract of the review and movie tables.
+
+    The extract is loaded once with two SELECTs and then kept current by
+    replaying the data manager's change log, so a refresh costs one query
+    for the new changes. Computed rollups are cached per scope (global or
+    one user) and dropped only when a change touches that scope.
+    """
+
+    def __init__(self, data_manager, sync_batch_size=1000, max_cached_scopes=1024):
+        self.data_manager = data_manager
+        self.sync_batch_size = sync_batch_size
+        self.max_cached_scopes = max_cached_scopes
+        self._lock = threading.Lock()
+        self._seq = None
+        self._cache = {}
+
+    def _load(self):
+        self._seq = self.data_manager.get_last_change_seq()
+        session = self.data_manager.db.session
+        Review, Movie = self.data_manager.Review, self.data_manager.Movie
+
+        rows = session.execute(select(
+            Review.id, Review.user_id, Review.movie_id, Review.rating, Review.created_at
+        )).all()
+        self._review_ids = np.array([row.id for row in rows], dtype=np.int64)
+        self._user_ids = np.array([row.user_id for row in rows], dtype=np.int64)
+        self._movie_ids = np.array([row.movie_id for row in rows], dtype=np.int64)
+        self._ratings = np.array([row.rating for row in rows], dtype=np.float64)
+        self._months = np.array([_month_key(row.created_at) for row in rows], dtype=np.int64)
+        self._alive = np.ones(len(rows), dtype=bool)
+        self._rows = {review_id: row for row, review_id in enumerate(self._review_ids.tolist())}
+        self._pending = []
+
+        # Movie attributes are stored densely by movie id
+        self._directors = []
+        self._director_codes = {}
+        movies = session.execute(select(Movie.id, Movie.year, Movie.director)).all()
+        size = max((movie.id for movie in movies), default=0) + 1
+        self._movie_years = np.full(size, NO_VALUE, dtype=np.int64)
+        self._movie_directors = np.full(size, NO_VALUE, dtype=np.int64)
+        for movie in movies:
+            self._set_movie(movie.id, movie.year, movie.director)
+        self._cache = {}
+
+    def _director_code(self, director):
+        if not director:
+            return NO_VALUE
+        code = self._director_codes.get(director)
+        if code is None:
+            code = self._director_codes[director] = len(self._directors)
+            self._directors.append(director)
+        return code
+
+    def _set_movie(self, movie_id, year, director):
+        if movie_id >= len(self._movie_years):
+            grow = max(movie_id + 1, 2 * len(self._movie_years)) - len(self._movie_years)
+            self._movie_years = np.concatenate([self._movie_years, np.full(grow, NO_VALUE, dtype=np.int64)])
+            self._movie_directors = np.concatenate([self._movie_directors, np.full(grow, NO_VALUE, dtype=np.int64)])
+        self._movie_years[movie_id] = NO_VALUE if year is None else year
+        self._movie_directors[movie_id] = self._director_code(director)
+
+    # Incremental refresh from the change log
+    def _refresh(self):
+        if self._seq is None:
+            self._load()
+            return
+
+        while True:
+            changes = self.data_manager.get_changes(self._seq, self.sync_batch_size)
+            for change in changes:
+                data = json.loads(change.data) if change.data else None
+                if change.entity == 'review':
+                    self._apply_review_change(change.entity_id, data)
+                elif change.entity == 'movie':
+                    self._apply_movie_change(change.entity_id, change.op, data)
+                self._seq = change.seq
+            if len(changes) < self.sync_batch_size:
+                break
+        self._flush_pending()
+
+    def _apply_review_change(self, review_id, data):
+        row = self._rows.pop(review_id, None)
+        if row is not None:
+            self._invalidate(user_id=self._row_user_id(row))
+            self._kill_row(row)
+        if data is not None:
+            self._rows[review_id] = len(self._review_ids) + len(self._pending)
+            self._pending.append((review_id, data['user_id'], data['movie_id'],
+                                  data['rating'], _month_key(data.get('created_at'))))
+            self._invalidate(user_id=data['user_id'])
+
+    def _apply_movie_change(self, movie_id, op, data):
+        if op == 'insert':
+            # A new movie has no reviews yet, so no rollup changes
+            self._set_movie(movie_id, data.get('year'), data.get('director'))
+            return
+
+        self._flush_pending()
+        if data is None:
+            # Reviews of the movie went with it through ON DELETE CASCADE
+            deleted = self._alive & (self._movie_ids == movie_id)
+            for review_id in self._review_ids[deleted].tolist():
+                self._rows.pop(review_id, None)
+            self._alive &= ~deleted
+            self._set_movie(movie_id, None, None)
+        else:
+            self._set_movie(movie_id, data.get('year'), data.get('director'))
+        # Year and director feed every scope that reviewed this movie
+        self._cache = {}
+
+    def _row_user_id(self, row):
+        if row < len(self._review_ids):
+            return int(self._user_ids[row])
+        return self._pending[row - len(self._review_ids)][1]
+
+    def _kill_row(self, row):
+        if row < len(self._review_ids):
+            self._alive[row] = False
+        else:
+            # Superseded before it was flushed; keep its slot so row numbers hold
+            self._pending[row - len(self._review_ids)] = None
+
+    def _flush_pending(self):
+        if not self._pending:
+            return
+        pending = self._pending
+        self._pending = []
+        alive = np.array([item is not None for item in pending], dtype=bool)
+        filled = [item or (0, 0, 0, 0.0, NO_VALUE) for item in pending]
+        columns = list(zip(*filled))
+        self._review_ids = np.concatenate([self._review_ids, np.array(columns[0], dtype=np.int64)])
+        self._user_ids = np.concatenate([self._user_ids, np.array(columns[1], dtype=np.int64)])
+        self._movie_ids = np.concatenate([self._movie_ids, np.array(columns[2], dtype=np.int64)])
+        self._ratings = np.concatenate([self._ratings, np.array(columns[3], dtype=np.float64)])
+        self._months = np.concatenate([self._months, np.array(columns[4], dtype=np.int64)])
+        self._alive = np.concatenate([self._alive, alive])
+
+        # Reclaim space once most rows are dead
+        if len(self._alive) > 1024 and self._alive.sum() * 2 < len(self._alive):
+            self._compact()
+
+    def _compact(self):
+        keep = self._alive
+        self._review_ids = self._review_ids[keep]
+        self._user_ids = self._user_ids[keep]
+        self._movie_ids = self._movie_ids[keep]
+        self._ratings = self._ratings[keep]
+        self._months = self._months[keep]
+        self._alive = np.ones(len(self._review_ids), dtype=bool)
+        self._rows = {review_id: row for row, review_id in enumerate(self._review_ids.tolist())}
+
+    def _invalidate(self, user_id):
+        self._cache.pop(None, None)
+        self._cache.pop(user_id, None)
+
+    # Rollups
+    def _compute(self, user_id):
+        mask = self._alive if user_id is None else self._alive & (self._user_ids == user_id)
+        ratings = self._ratings[mask]
+        movie_ids = self._movie_ids[mask]
+        months = self._months[mask]
+
+        buckets = np.clip(np.rint(ratings), 0, RATING_BINS - 1).astype(np.int64)
+        histogram = np.bincount(buckets, minlength=RATING_BINS)
+
+        in_range = movie_ids < len(self._movie_years)
+        years = np.where(in_range, self._movie_years[np.where(in_range, movie_ids, 0)], NO_VALUE)
+        directors = np.where(in_range, self._movie_directors[np.where(in_range, movie_ids, 0)], NO_VALUE)
+        year_groups, year_averages, year_counts = _grouped_average(years, ratings)
+        director_groups, director_averages, director_counts = _grouped_average(directors, ratings)
+        by_director = sorted(zip(director_groups.tolist(), director_averages.tolist(), director_counts.tolist()),
+                             key=lambda item: (-item[2], self._directors[item[0]]))
+
+        month_groups, month_counts = np.unique(months[months != NO_VALUE], return_counts=True)
+
+        return {
+            'review_count': int(len(ratings)),
+            'average_rating': round(float(ratings.mean()), 2) if len(ratings) else None,
+            'rating_histogram': [{'rating': rating, 'count': count}
+                                 for rating, count in enumerate(histogram.tolist())],
+            'average_rating_by_year': [
+                {'year': year, 'average_rating': round(average, 2), 'review_count': count}
+                for year, average, count in zip(year_groups.tolist(), year_averages.tolist(), year_counts.tolist())
+            ],
+            'average_rating_by_director': [
+                {'director': self._directors[code], 'average_rating': round(average, 2), 'review_count': count}
+                for code, average, count in by_director
+            ],
+            'reviews_per_month': [
+                {'month': f'{month // 100:04d}-{month % 100:02d}', 'count': count}
+                for month, count in zip(month_groups.tolist(), month_counts.tolist())
+            ]
+        }
+
+    def get_stats(self, user_id=None):
+        """Return the rollups for one user, or for everyone when user_id is None"""
+        with self._lock:
+            self._refresh()
+            stats = self._cache.get(user_id)
+            if stats is None:
+                if len(self._cache) >= self.max_cached_scopes:
+                    self._cache.pop(next(iter(self._cache)))
+                stats = self._cache[user_id] = self._compute(user_id)
+            return stats
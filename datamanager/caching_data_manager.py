@@ -0,0 +1,475 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from datamanager.data_manager_interface import DataManagerInterface
+
+
+class UserRecord:
+    columns = ('id', 'username')
+    __slots__ = columns
+
+    def __init__(self, id, username):
+        self.id = id
+        self.username = username
+
+    def __repr__(self):
+        return f'<User {self.username}>'
+
+
+class MovieRecord:
+    columns = ('id', 'title', 'director', 'year')
+    __slots__ = columns
+
+    def __init__(self, id, title, director, year):
+        self.id = id
+        self.title = title
+        self.director = director
+        self.year = year
+
+    def __repr__(self):
+        return f'<Movie {self.title}>'
+
+
+class ReviewRecord:
+    columns = ('id', 'rating', 'comment', 'user_id', 'movie_id', 'created_at')
+    # author and movie mirror the ORM relationships; they are set on every read
+    __slots__ = columns + ('author', 'movie')
+
+    def __init__(self, id, rating, comment, user_id, movie_id, created_at):
+        self.id = id
+        self.rating = rating
+        self.comment = comment
+        self.user_id = user_id
+        self.movie_id = movie_id
+        self.created_at = created_at
+        self.author = None
+        self.movie = None
+
+    def __repr__(self):
+        return f'<Review {self.id} by User {self.user_id} for Movie {self.movie_id}>'
+
+
+def _record(record_class, obj):
+    """Copy the mapped columns of an ORM object (or a change log row dict) into a record"""
+    if isinstance(obj, dict):
+        values = {name: obj.get(name) for name in record_class.columns}
+        # The change log stores datetimes as strings
+        if isinstance(values.get('created_at'), str):
+            values['created_at'] = datetime.fromisoformat(values['created_at'])
+        return record_class(**values)
+    return record_class(*(getattr(obj, name) for name in record_class.columns))
+
+
+class UserPartition:
+    """Everything cached for one user: the user, their reviews and the movies those reviews point at"""
+    __slots__ = ('user', 'reviews', 'movies')
+
+    def __init__(self, user, reviews, movies):
+        self.user = user
+        self.reviews = reviews
+        self.movies = movies
+
+    def __len__(self):
+        return 1 + len(self.reviews) + len(self.movies)
+
+
+class MoviePartition:
+    """One movie, every review of it and the users who wrote them"""
+    __slots__ = ('movie', 'reviews', 'authors')
+
+    def __init__(self, movie, reviews, authors):
+        self.movie = movie
+        self.reviews = reviews
+        self.authors = authors
+
+    def __len__(self):
+        return 1 + len(self.reviews) + len(self.authors)
+
+
+class UserListPartition:
+    """Every user, for the user listing"""
+    __slots__ = ('users',)
+
+    def __init__(self, users):
+        self.users = users
+
+    def __len__(self):
+        return len(self.users)
+
+
+class CachingDataManager(DataManagerInterface):
+    """
+    Read-through, in-memory hot tier in front of another data manager.
+
+    Reads are served from compact records held in per-user and per-movie
+    partitions (and one for the user listing), which are loaded from the
+    backend on first use and evicted least-recently-used once more than
+    `max_records` records are cached.
+    Reads return these records rather than ORM objects; review records
+    also carry `author` and `movie`, like the ORM relationships.
+
+    The cache is kept coherent by replaying the backend's change log: right
+    after each write made through this manager, and at most every
+    `sync_interval` seconds on reads, to pick up writes from other processes.
+    """
+
+    def __init__(self, backend, max_records=100000, sync_interval=1.0, sync_batch_size=500):
+        self.backend = backend
+        self.max_records = max_records
+        self.sync_interval = sync_interval
+        self.sync_batch_size = sync_batch_size
+
+        self._lock = threading.RLock()
+        self._partitions = OrderedDict()  # ('user' | 'movie', id) or ('users', None) -> partition, oldest first
+        self._reviews = {}
+        self._size = 0
+        self._seq = None
+        self._synced_at = 0.0
+
+    def __getattr__(self, name):
+        # Model classes, db, profiler and the rest come from the backend
+        return getattr(self.backend, name)
+
+    def clear(self):
+        with self._lock:
+            self._partitions.clear()
+            self._reviews.clear()
+            self._size = 0
+
+    # Partition management
+    def _user_partition(self, user_id):
+        key = ('user', user_id)
+        partition = self._partitions.get(key)
+        if partition is not None:
+            self._partitions.move_to_end(key)
+            return partition
+
+        user = self.backend.get_user_by_id(user_id)
+        reviews = {review.id: _record(ReviewRecord, review)
+                   for review in self.backend.get_user_reviews(user_id)}
+        movies = {movie.id: _record(MovieRecord, movie)
+                  for movie in self.backend.get_user_movies(user_id)}
+        partition = UserPartition(_record(UserRecord, user) if user else None, reviews, movies)
+        self._add_partition(key, partition)
+        return partition
+
+    def _movie_partition(self, movie_id):
+        key = ('movie', movie_id)
+        partition = self._partitions.get(key)
+        if partition is not None:
+            self._partitions.move_to_end(key)
+            return partition
+
+        movie = self.backend.Movie.query.get(movie_id)
+        reviews = {review.id: _record(ReviewRecord, review)
+                   for review in self.backend.get_movie_reviews(movie_id)}
+        author_ids = {review.user_id for review in reviews.values()}
+        User = self.backend.User
+        authors = {user.id: _record(UserRecord, user)
+                   for user in User.query.filter(User.id.in_(author_ids))} if author_ids else {}
+        partition = MoviePartition(_record(MovieRecord, movie) if movie else None, reviews, authors)
+        self._add_partition(key, partition)
+        return partition
+
+    def _user_list(self):
+        key = ('users', None)
+        partition = self._partitions.get(key)
+        if partition is not None:
+            self._partitions.move_to_end(key)
+            return partition
+
+        partition = UserListPartition({user.id: _record(UserRecord, user)
+                                       for user in self.backend.get_all_users()})
+        self._add_partition(key, partition)
+        return partition
+
+    def _add_partition(self, key, partition):
+        self._partitions[key] = partition
+        if key[0] != 'users':
+            self._reviews.update(partition.reviews)
+        self._size += len(partition)
+        self._evict()
+
+    def _evict(self):
+        # The caller keeps using a partition it just loaded even if that
+        # partition alone is over budget and gets evicted here
+        while self._size > self.max_records and self._partitions:
+            self._drop_partition(next(iter(self._partitions)))
+
+    def _drop_partition(self, key):
+        partition = self._partitions.pop(key, None)
+        if partition is None:
+            return
+        self._size -= len(partition)
+        if key[0] == 'users':
+            return
+        # A review stays indexed while the partition on its other side is cached
+        for review in partition.reviews.values():
+            other = ('movie', review.movie_id) if key[0] == 'user' else ('user', review.user_id)
+            if other not in self._partitions:
+                self._reviews.pop(review.id, None)
+
+    # Change log replay
+    def _sync(self, force=False):
+        started = time.monotonic()
+        if not force and started - self._synced_at < self.sync_interval:
+            return
+        if self._seq is None:
+            # Nothing is cached yet, so only the position in the log matters
+            self._seq = self.backend.get_last_change_seq()
+        else:
+            while True:
+                changes = self.backend.get_changes(self._seq, self.sync_batch_size)
+                # Movies written in this batch, so new reviews can link to them
+                seen_movies = {}
+                deleted_movie_ids = set()
+                for change in changes:
+                    data = json.loads(change.data) if change.data else None
+                    if change.entity == 'movie' and data is None:
+                        # Runs of movie deletes (bulk deletes) are applied in one pass
+                        deleted_movie_ids.add(change.entity_id)
+                        self._seq = change.seq
+                        continue
+                    if deleted_movie_ids:
+                        self._apply_movie_deletes(deleted_movie_ids)
+                        deleted_movie_ids = set()
+                    if change.entity == 'user':
+                        self._apply_user_change(change.entity_id, data)
+                    elif change.entity == 'movie':
+                        seen_movies[change.entity_id] = self._apply_movie_change(change.entity_id, data)
+                    elif change.entity == 'review':
+                        self._apply_review_change(change.entity_id, data, seen_movies)
+                    self._seq = change.seq
+                if deleted_movie_ids:
+                    self._apply_movie_deletes(deleted_movie_ids)
+                if len(changes) < self.sync_batch_size:
+                    break
+            # Replayed changes add records to cached partitions
+            self._evict()
+        # Everything committed before the replay started has been applied
+        self._synced_at = started
+
+    def _apply_user_change(self, user_id, data):
+        user_list = self._partitions.get(('users', None))
+        if data is None:
+            # The user's reviews went with them through ON DELETE CASCADE
+            if user_list is not None and user_list.users.pop(user_id, None):
+                self._size -= 1
+            self._drop_partition(('user', user_id))
+            for key in [key for key, partition in self._partitions.items()
+                        if key[0] == 'movie' and user_id in partition.authors]:
+                self._drop_partition(key)
+            return
+
+        user = _record(UserRecord, data)
+        if user_list is not None:
+            if user_id not in user_list.users:
+                self._size += 1
+            user_list.users[user_id] = user
+        for key, partition in self._partitions.items():
+            if key == ('user', user_id):
+                partition.user = user
+            elif key[0] == 'movie' and user_id in partition.authors:
+                partition.authors[user_id] = user
+
+    def _user_record(self, user_id):
+        # Share a cached record of the user when there is one
+        partition = self._partitions.get(('user', user_id))
+        if partition is not None:
+            return partition.user
+        user_list = self._partitions.get(('users', None))
+        if user_list is not None and user_id in user_list.users:
+            return user_list.users[user_id]
+        for key, partition in self._partitions.items():
+            if key[0] == 'movie' and user_id in partition.authors:
+                return partition.authors[user_id]
+        user = self.backend.get_user_by_id(user_id)
+        return _record(UserRecord, user) if user else None
+
+    def _apply_movie_change(self, movie_id, data):
+        movie = _record(MovieRecord, data)
+        for key, partition in self._partitions.items():
+            if key[0] == 'user' and movie_id in partition.movies:
+                partition.movies[movie_id] = movie
+            elif key == ('movie', movie_id):
+                partition.movie = movie
+        return movie
+
+    def _apply_movie_deletes(self, movie_ids):
+        # Reviews of deleted movies were removed by ON DELETE CASCADE
+        for movie_id in movie_ids:
+            self._drop_partition(('movie', movie_id))
+        for key, partition in self._partitions.items():
+            if key[0] != 'user':
+                continue
+            for movie_id in movie_ids & partition.movies.keys():
+                del partition.movies[movie_id]
+                self._size -= 1
+            for review in [r for r in partition.reviews.values() if r.movie_id in movie_ids]:
+                del partition.reviews[review.id]
+                self._size -= 1
+        for review_id in [r.id for r in self._reviews.values() if r.movie_id in movie_ids]:
+            del self._reviews[review_id]
+
+    def _apply_review_change(self, review_id, data, seen_movies):
+        review = _record(ReviewRecord, data) if data is not None else None
+        old = self._reviews.get(review_id)
+        if (old is not None and review is not None
+                and (old.user_id, old.movie_id) == (review.user_id, review.movie_id)):
+            # Plain edit: swap the record wherever it is indexed
+            for key in (('user', review.user_id), ('movie', review.movie_id)):
+                partition = self._partitions.get(key)
+                if partition is not None and review_id in partition.reviews:
+                    partition.reviews[review_id] = review
+            self._reviews[review_id] = review
+            return
+
+        if old is not None:
+            del self._reviews[review_id]
+            self._remove_review(old)
+        if review is None:
+            return
+
+        user_key, movie_key = ('user', review.user_id), ('movie', review.movie_id)
+        user_partition = self._partitions.get(user_key)
+        if user_partition is not None:
+            if review.movie_id not in user_partition.movies and review.movie_id in seen_movies:
+                user_partition.movies[review.movie_id] = seen_movies[review.movie_id]
+                self._size += 1
+            if review.movie_id in user_partition.movies:
+                user_partition.reviews[review.id] = review
+                self._size += 1
+            else:
+                # The movie record is not cached; reload this user on next read
+                self._drop_partition(user_key)
+        movie_partition = self._partitions.get(movie_key)
+        if movie_partition is not None:
+            if review.user_id not in movie_partition.authors:
+                movie_partition.authors[review.user_id] = self._user_record(review.user_id)
+                self._size += 1
+            movie_partition.reviews[review.id] = review
+            self._size += 1
+        if user_key in self._partitions or movie_key in self._partitions:
+            self._reviews[review.id] = review
+
+    def _remove_review(self, review):
+        movie_partition = self._partitions.get(('movie', review.movie_id))
+        if movie_partition is not None and movie_partition.reviews.pop(review.id, None):
+            self._size -= 1
+            # A user is an author of the movie only while they have a review of it
+            if not any(r.user_id == review.user_id for r in movie_partition.reviews.values()):
+                if movie_partition.authors.pop(review.user_id, None):
+                    self._size -= 1
+        user_partition = self._partitions.get(('user', review.user_id))
+        if user_partition is not None and user_partition.reviews.pop(review.id, None):
+            self._size -= 1
+            # A movie is in the user's library only while they have a review of it
+            if not any(r.movie_id == review.movie_id for r in user_partition.reviews.values()):
+                if user_partition.movies.pop(review.movie_id, None):
+                    self._size -= 1
+
+    def _write(self, method, *args):
+        # The backend write runs unlocked so concurrent writes can still be
+        # batched by group commit; only replaying the log needs the lock.
+        result = method(*args)
+        written_at = time.monotonic()
+        with self._lock:
+            # Skip the replay if one that started after this write already ran
+            if self._synced_at < written_at:
+                self._sync(force=True)
+        return result
+
+    # Reads
+    def get_all_users(self):
+        with self._lock:
+            self._sync()
+            return sorted(self._user_list().users.values(), key=lambda user: user.id)
+
+    def get_user_by_id(self, user_id):
+        with self._lock:
+            self._sync()
+            return self._user_partition(user_id).user
+
+    def get_user_movies(self, user_id):
+        with self._lock:
+            self._sync()
+            return list(self._user_partition(user_id).movies.values())
+
+    def get_user_reviews(self, user_id):
+        with self._lock:
+            self._sync()
+            partition = self._user_partition(user_id)
+            return self._link(partition.reviews.values(), {user_id: partition.user}, partition.movies)
+
+    def get_movie_reviews(self, movie_id):
+        with self._lock:
+            self._sync()
+            partition = self._movie_partition(movie_id)
+            return self._link(partition.reviews.values(), partition.authors, {movie_id: partition.movie})
+
+    def get_review(self, review_id):
+        with self._lock:
+            self._sync()
+            review = self._reviews.get(review_id)
+            if review is None:
+                # Cache the movie's partition, which includes the review
+                review = self.backend.get_review(review_id)
+                if review is None:
+                    return None
+                review = self._movie_partition(review.movie_id).reviews.get(review_id)
+                if review is None:
+                    return None
+            # Link through the user's partition if only that one is cached
+            user_partition = self._partitions.get(('user', review.user_id))
+            if ('movie', review.movie_id) not in self._partitions and user_partition is not None:
+                return self._link([review], {review.user_id: user_partition.user}, user_partition.movies)[0]
+            movie_partition = self._movie_partition(review.movie_id)
+            return self._link([review], movie_partition.authors, {review.movie_id: movie_partition.movie})[0]
+
+    def _link(self, reviews, users, movies):
+        # Point reviews at the current user and movie records, the way the
+        # ORM relationships would
+        reviews = list(reviews)
+        for review in reviews:
+            review.author = users.get(review.user_id)
+            review.movie = movies.get(review.movie_id)
+        return reviews
+
+    def get_changes(self, since=0, limit=100):
+        return self.backend.get_changes(since, limit)
+
+    def get_last_change_seq(self):
+        return self.backend.get_last_change_seq()
+
+    # Writes go to the backend, then the cache catches up from the change log
+    def add_user(self, username):
+        return self._write(self.backend.add_user, username)
+
+    def add_movie(self, user_id, name, director, year, rating):
+        return self._write(self.backend.add_movie, user_id, name, director, year, rating)
+
+    def update_movie(self, movie_id, name, director, year, rating):
+        return self._write(self.backend.update_movie, movie_id, name, director, year, rating)
+
+    def delete_movie(self, movie_id):
+        return self._write(self.backend.delete_movie, movie_id)
+
+    def delete_movies(self, movie_ids):
+        return self._write(self.backend.delete_movies, movie_ids)
+
+    def delete_user_movies(self, user_id, movie_ids=None):
+        return self._write(self.backend.delete_user_movies, user_id, movie_ids)
+
+    def add_review(self, user_id, movie_id, text, rating):
+        return self._write(self.backend.add_review, user_id, movie_id, text, rating)
+
+    def update_review(self, review_id, text, rating):
+        return self._write(self.backend.update_review, review_id, text, rating)
+
+    def delete_review(self, review_id):
+        return self._write(self.backend.delete_review, review_id)
+
+    def compact_changes(self):
+        return self.backend.compact_changes()
@@ -26,6 +26,14 @@ class DataManagerInterface(ABC):
     def delete_movie(self, movie_id):
         pass
 
+    @abstractmethod
+    def delete_movies(self, movie_ids):
+        pass
+
+    @abstractmethod
+    def delete_user_movies(self, user_id, movie_ids=None):
+        pass
+
     @abstractmethod
     def get_movie_reviews(self, movie_id):
         pass
@@ -48,4 +56,16 @@ class DataManagerInterface(ABC):
 
     @abstractmethod
     def get_review(self, review_id):
-        pass
\ No newline at end of file
+        pass
+
+    @abstractmethod
+    def get_changes(self, since=0, limit=100):
+        pass
+
+    @abstractmethod
+    def get_last_change_seq(self):
+        pass
+
+    @abstractmethod
+    def compact_changes(self):
+        pass
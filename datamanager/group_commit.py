@@ -0,0 +1,99 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+_STOP = object()
+
+
+class GroupCommitWriter:
+    """
+    Single writer thread that commits queued write operations in batches.
+
+    Each operation is a callable that makes its changes through `session`
+    without committing. Operations that arrive within `max_delay` seconds of
+    each other (up to `max_batch_size`) share one transaction and one fsync.
+    If anything in a batch fails, the batch is rolled back and its
+    operations are replayed one transaction each, so every caller gets its
+    own result or its own error.
+    """
+
+    def __init__(self, app, session, max_batch_size=64, max_delay=0.002):
+        self.app = app
+        self.session = session
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='group-commit-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, operation, *args):
+        """Queue an operation and block until its batch has been committed"""
+        future = Future()
+        self._queue.put((operation, args, future))
+        return future.result()
+
+    def close(self):
+        """Commit everything already queued, then stop the writer thread"""
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _run(self):
+        # The app context gives the writer its own scoped session
+        with self.app.app_context():
+            while True:
+                batch, stop = self._next_batch()
+                if batch:
+                    self._commit_batch(batch)
+                if stop:
+                    self.session.remove()
+                    return
+
+    def _next_batch(self):
+        first = self._queue.get()
+        if first is _STOP:
+            return [], True
+
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _commit_batch(self, batch):
+        try:
+            results = [operation(*args) for operation, args, _ in batch]
+            self._commit()
+        except Exception:
+            self.session.rollback()
+            for item in batch:
+                self._commit_batch_item(item)
+            return
+
+        for (_, _, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def _commit_batch_item(self, item):
+        operation, args, future = item
+        try:
+            result = operation(*args)
+            self._commit()
+        except Exception as e:
+            self.session.rollback()
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+
+    def _commit(self):
+        # Detach the written objects before committing so they keep their
+        # loaded attributes instead of being expired into this thread's session.
+        self.session.flush()
+        self.session.expunge_all()
+        self.session.commit()
@@ -0,0 +1,146 @@
+import math
+import re
+import threading
+import time
+from collections import deque
+from sqlalchemy import event
+
+# Expanded IN lists render one placeholder per value; fold them so that
+# lookups with different list lengths count as the same statement.
+_PLACEHOLDER_LIST = re.compile(r'\?(?:\s*,\s*\?)+')
+_EXPLAINABLE = ('SELECT', 'UPDATE', 'DELETE', 'INSERT', 'WITH')
+
+
+def normalize_statement(statement):
+    """Collapse whitespace and placeholder lists so equivalent SQL shares one key"""
+    statement = ' '.join(statement.split())
+    return _PLACEHOLDER_LIST.sub('?, ...', statement)
+
+
+def find_full_scans(plan):
+    """Return the tables an EXPLAIN QUERY PLAN reads without using an index"""
+    scans = []
+    for detail in plan:
+        # e.g. "SCAN review" vs "SEARCH review USING INDEX ..." / "SCAN review USING COVERING INDEX ..."
+        if detail.startswith('SCAN ') and 'USING' not in detail and 'CONSTANT ROW' not in detail:
+            scans.append(detail[len('SCAN '):].split()[0])
+    return scans
+
+
+class StatementStats:
+    """Timing and plan information for one distinct statement"""
+
+    def __init__(self, statement, sample_size):
+        self.statement = statement
+        self.count = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.durations = deque(maxlen=sample_size)
+        self.plan = None
+        self.full_scans = []
+
+    def record(self, duration):
+        self.count += 1
+        self.total_time += duration
+        self.max_time = max(self.max_time, duration)
+        self.durations.append(duration)
+
+    @property
+    def p95(self):
+        if not self.durations:
+            return 0.0
+        ordered = sorted(self.durations)
+        return ordered[math.ceil(0.95 * len(ordered)) - 1]
+
+    def to_dict(self):
+        return {
+            'statement': self.statement,
+            'count': self.count,
+            'total_ms': round(self.total_time * 1000, 3),
+            'avg_ms': round(self.total_time * 1000 / self.count, 3) if self.count else 0.0,
+            'p95_ms': round(self.p95 * 1000, 3),
+            'max_ms': round(self.max_time * 1000, 3),
+            'plan': self.plan,
+            'full_scans': self.full_scans
+        }
+
+
+class QueryProfiler:
+    """
+    Collects per-statement execution statistics from SQLAlchemy cursor events.
+
+    Memory is bounded: only the last `sample_size` durations of each
+    statement are kept for percentiles, and EXPLAIN QUERY PLAN runs once per
+    distinct statement, on its first execution.
+    """
+
+    # Report orderings and the column each one sorts by
+    ORDERINGS = {'total': 'total_ms', 'count': 'count', 'p95': 'p95_ms', 'avg': 'avg_ms'}
+
+    def __init__(self, sample_size=1000, explain=True):
+        self.sample_size = sample_size
+        self.explain = explain
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._engines = []
+
+    def attach(self, engine):
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        self._engines.append(engine)
+
+    def detach(self):
+        for engine in self._engines:
+            event.remove(engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.remove(engine, 'after_cursor_execute', self._after_cursor_execute)
+        self._engines = []
+
+    def reset(self):
+        with self._lock:
+            self._stats = {}
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        # Kept on the execution context, which is discarded with the statement
+        # even when it fails and after_cursor_execute never runs
+        context._query_profiler_start = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        duration = time.perf_counter() - context._query_profiler_start
+        key = normalize_statement(statement)
+
+        with self._lock:
+            stats = self._stats.get(key)
+            first_execution = stats is None
+            if first_execution:
+                stats = self._stats[key] = StatementStats(key, self.sample_size)
+            stats.record(duration)
+
+        if first_execution and self.explain and not executemany:
+            self._explain(conn, stats, statement, parameters)
+
+    def _explain(self, conn, stats, statement, parameters):
+        if not statement.lstrip().upper().startswith(_EXPLAINABLE):
+            return
+        # Use a raw DBAPI cursor so the EXPLAIN itself is not profiled
+        cursor = conn.connection.dbapi_connection.cursor()
+        try:
+            cursor.execute(f'EXPLAIN QUERY PLAN {statement}', parameters or ())
+            plan = [row[-1] for row in cursor.fetchall()]
+        except Exception as e:
+            plan = [f'EXPLAIN failed: {e}']
+        finally:
+            cursor.close()
+        with self._lock:
+            stats.plan = plan
+            stats.full_scans = find_full_scans(plan)
+
+    def report(self, order_by='total', limit=20):
+        """Return the worst statements as dicts, ranked by `order_by`"""
+        if order_by not in self.ORDERINGS:
+            raise ValueError(f'order_by must be one of {", ".join(self.ORDERINGS)}')
+        if limit < 0:
+            raise ValueError('limit must be >= 0')
+        with self._lock:
+            rows = [stats.to_dict() for stats in self._stats.values()]
+        rows.sort(key=lambda row: row[self.ORDERINGS[order_by]], reverse=True)
+        return rows[:limit] if limit else rows
@@ -1,7 +1,21 @@
+import json
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import MetaData, delete, event, func, insert, inspect, select, text
+from sqlalchemy.orm import aliased
+from sqlalchemy.schema import CreateTable
 from datamanager.data_manager_interface import DataManagerInterface
+from datamanager.group_commit import GroupCommitWriter
+from datamanager.query_profiler import QueryProfiler
 from datetime import datetime
-from models import db, User, Movie, Review
+from models import db, User, Movie, Review, Change
+
+
+def _enable_foreign_keys(dbapi_connection, connection_record):
+    # SQLite ignores ON DELETE CASCADE unless foreign keys are switched on per connection
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
 
 class SQLiteDataManager(DataManagerInterface):
     def __init__(self, app):
@@ -13,10 +27,145 @@ class SQLiteDataManager(DataManagerInterface):
         self.User = User
         self.Movie = Movie
         self.Review = Review
+        self.Change = Change
+
+        # Optional per-statement timing and query plan capture
+        self.profiler = QueryProfiler() if app.config.get('QUERY_PROFILING') else None
 
         # Create tables
         with app.app_context():
+            event.listen(self.db.engine, 'connect', _enable_foreign_keys)
+            if self.profiler:
+                self.profiler.attach(self.db.engine)
             self.db.create_all()
+            self._add_missing_columns()
+            self._add_missing_cascades()
+            in_memory = self.db.engine.url.database in (None, '', ':memory:')
+
+        # Optional group commit: mutations from concurrent requests are
+        # committed in batches by a single writer thread
+        self.group_commit = None
+        if app.config.get('GROUP_COMMIT'):
+            if in_memory:
+                raise ValueError('GROUP_COMMIT requires a file-backed SQLite database')
+            self.group_commit = GroupCommitWriter(
+                app, self.db.session,
+                max_batch_size=app.config.get('GROUP_COMMIT_MAX_BATCH', 64),
+                max_delay=app.config.get('GROUP_COMMIT_MAX_DELAY', 0.002)
+            )
+
+    def _add_missing_columns(self):
+        # create_all only creates missing tables; add nullable columns that
+        # were introduced after a database was first created
+        inspector = inspect(self.db.engine)
+        with self.db.engine.begin() as connection:
+            for table in self.db.metadata.sorted_tables:
+                existing = {column['name'] for column in inspector.get_columns(table.name)}
+                for column in table.columns:
+                    if column.name not in existing and column.nullable:
+                        column_type = column.type.compile(dialect=self.db.engine.dialect)
+                        connection.execute(text(
+                            f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'
+                        ))
+
+    def _add_missing_cascades(self):
+        # SQLite cannot alter a foreign key or AUTOINCREMENT, so tables whose
+        # ON DELETE rules or id allocation differ from the models are rebuilt:
+        # create the new table, copy the rows, drop the old one and rename the
+        # new one into place.
+        inspector = inspect(self.db.engine)
+        with self.db.engine.connect() as connection:
+            schemas = dict(connection.execute(text("SELECT name, sql FROM sqlite_master WHERE type = 'table'")).all())
+        outdated = []
+        for table in self.db.metadata.sorted_tables:
+            expected = {((fk.parent.name,), fk.column.table.name, (fk.ondelete or '').upper())
+                        for fk in table.foreign_keys}
+            existing = {(tuple(fk['constrained_columns']), fk['referred_table'],
+                         (fk['options'].get('ondelete') or '').upper())
+                        for fk in inspector.get_foreign_keys(table.name)}
+            autoincrement = 'AUTOINCREMENT' in schemas[table.name].upper()
+            if expected != existing or autoincrement != table.dialect_options['sqlite']['autoincrement']:
+                outdated.append(table)
+        if not outdated:
+            return
+
+        # Build the new tables under a temporary name, with their foreign
+        # keys still pointing at the real tables
+        metadata = MetaData()
+        for table in self.db.metadata.sorted_tables:
+            table.to_metadata(metadata)
+
+        # Foreign keys can only be switched off outside a transaction
+        connection = self.db.engine.raw_connection()
+        cursor = connection.cursor()
+        try:
+            cursor.execute('PRAGMA foreign_keys=OFF')
+            cursor.execute('BEGIN')
+            for table in outdated:
+                new_table = table.to_metadata(metadata, name=f'_{table.name}_new')
+                existing = {column['name'] for column in inspector.get_columns(table.name)}
+                columns = ', '.join(f'"{column.name}"' for column in table.columns if column.name in existing)
+                cursor.execute(str(CreateTable(new_table).compile(dialect=self.db.engine.dialect)))
+                cursor.execute(f'INSERT INTO "{new_table.name}" ({columns}) SELECT {columns} FROM "{table.name}"')
+                cursor.execute(f'DROP TABLE "{table.name}"')
+                cursor.execute(f'ALTER TABLE "{new_table.name}" RENAME TO "{table.name}"')
+                if table.dialect_options['sqlite']['autoincrement']:
+                    # Ids deleted before the rebuild may be above the copied
+                    # ones; the change log still refers to them
+                    cursor.execute(f'SELECT MAX(entity_id) FROM "{Change.__tablename__}" WHERE entity = ?',
+                                   (table.name,))
+                    highest = cursor.fetchone()[0]
+                    if highest is not None:
+                        cursor.execute('DELETE FROM sqlite_sequence WHERE name = ? AND seq < ?', (table.name, highest))
+                        cursor.execute('INSERT INTO sqlite_sequence (name, seq) SELECT ?, ? '
+                                       'WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = ?)',
+                                       (table.name, highest, table.name))
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            cursor.execute('PRAGMA foreign_keys=ON')
+            cursor.close()
+            connection.close()
+
+    def _write(self, operation, *args):
+        # Mutations are written as uncommitted units so they can either be
+        # committed right away or share a transaction with other requests.
+        if self.group_commit:
+            result = self.group_commit.submit(operation, *args)
+            # The writer committed through its own session. Expire this one
+            # as a commit here would, and adopt the returned object so its
+            # relationships load in the caller's session.
+            self.db.session.expire_all()
+            if isinstance(result, self.db.Model):
+                result = self.db.session.merge(result, load=False)
+            return result
+        try:
+            result = operation(*args)
+            self.db.session.commit()
+        except Exception:
+            self.db.session.rollback()
+            raise
+        return result
+
+    # Change log helpers. Entries are added to the session of the mutation
+    # they describe, so they are committed (or rolled back) together with it.
+    def _log_change(self, entity, op, obj):
+        data = {column.name: getattr(obj, column.name) for column in obj.__table__.columns}
+        self.db.session.add(self.Change(
+            entity=entity,
+            entity_id=obj.id,
+            op=op,
+            data=json.dumps(data, default=str)
+        ))
+
+    def _log_deletes(self, entity, entity_ids):
+        if entity_ids:
+            self.db.session.execute(insert(self.Change), [
+                {'entity': entity, 'entity_id': entity_id, 'op': 'delete', 'data': None}
+                for entity_id in entity_ids
+            ])
 
     def get_all_users(self):
         return self.User.query.all()
@@ -33,39 +182,71 @@ class SQLiteDataManager(DataManagerInterface):
         return self.Movie.query.filter(self.Movie.id.in_(movie_ids)).all()
 
     def add_user(self, username):
+        return self._write(self._add_user, username)
+
+    def _add_user(self, username):
         user = self.User(username=username)
         self.db.session.add(user)
-        self.db.session.commit()
+        self.db.session.flush()
+        self._log_change('user', 'insert', user)
         return user
 
     def add_movie(self, user_id, name, director, year, rating):
+        return self._write(self._add_movie, user_id, name, director, year, rating)
+
+    def _add_movie(self, user_id, name, director, year, rating):
         # Create the movie
-        movie = self.Movie(title=name)
+        movie = self.Movie(title=name, director=director, year=year)
         self.db.session.add(movie)
-        self.db.session.commit()
+        self.db.session.flush()
+        self._log_change('movie', 'insert', movie)
 
         # Create a review to connect the user and movie
         review = self.Review(user_id=user_id, movie_id=movie.id, rating=rating or 0, comment="")
         self.db.session.add(review)
-        self.db.session.commit()
+        self.db.session.flush()
+        self._log_change('review', 'insert', review)
 
         return movie
 
     def update_movie(self, movie_id, name, director, year, rating):
+        return self._write(self._update_movie, movie_id, name, director, year, rating)
+
+    def _update_movie(self, movie_id, name, director, year, rating):
         movie = self.Movie.query.get(movie_id)
         if movie:
             movie.title = name
-            self.db.session.commit()
+            movie.director = director
+            movie.year = year
+            self._log_change('movie', 'update', movie)
             return movie
         return None
 
     def delete_movie(self, movie_id):
-        movie = self.Movie.query.get(movie_id)
-        if movie:
-            self.db.session.delete(movie)
-            self.db.session.commit()
-            return True
-        return False
+        return self.delete_movies([movie_id]) > 0
+
+    def delete_movies(self, movie_ids):
+        if not movie_ids:
+            return 0
+        return self._write(self._delete_movies_where, self.Movie.id.in_(movie_ids))
+
+    def delete_user_movies(self, user_id, movie_ids=None):
+        # A user's library is every movie they have reviewed
+        library = select(self.Review.movie_id).where(self.Review.user_id == user_id)
+        criteria = [self.Movie.id.in_(library)]
+        if movie_ids is not None:
+            if not movie_ids:
+                return 0
+            criteria.append(self.Movie.id.in_(movie_ids))
+        return self._write(self._delete_movies_where, *criteria)
+
+    def _delete_movies_where(self, *criteria):
+        # Reviews are removed by the database through ON DELETE CASCADE; a
+        # movie delete in the change log implies its reviews are gone too.
+        statement = delete(self.Movie).where(*criteria).returning(self.Movie.id)
+        deleted_ids = self.db.session.execute(statement).scalars().all()
+        self._log_deletes('movie', deleted_ids)
+        return len(deleted_ids)
 
     # Review-related methods
     def get_movie_reviews(self, movie_id):
@@ -75,27 +256,74 @@ class SQLiteDataManager(DataManagerInterface):
         return self.Review.query.filter_by(user_id=user_id).all()
 
     def add_review(self, user_id, movie_id, text, rating):
+        return self._write(self._add_review, user_id, movie_id, text, rating)
+
+    def _add_review(self, user_id, movie_id, text, rating):
         review = self.Review(user_id=user_id, movie_id=movie_id, comment=text, rating=rating)
         self.db.session.add(review)
-        self.db.session.commit()
+        self.db.session.flush()
+        self._log_change('review', 'insert', review)
         return review
 
     def update_review(self, review_id, text, rating):
+        return self._write(self._update_review, review_id, text, rating)
+
+    def _update_review(self, review_id, text, rating):
         review = self.Review.query.get(review_id)
         if review:
             review.comment = text
             review.rating = rating
-            self.db.session.commit()
+            self._log_change('review', 'update', review)
             return review
         return None
 
     def delete_review(self, review_id):
+        return self._write(self._delete_review, review_id)
+
+    def _delete_review(self, review_id):
         review = self.Review.query.get(review_id)
         if review:
             self.db.session.delete(review)
-            self.db.session.commit()
+            self._log_deletes('review', [review_id])
             return True
         return False
 
     def get_review(self, review_id):
         return self.Review.query.get(review_id)
+
+    # Change feed methods
+    def get_changes(self, since=0, limit=100):
+        return (self.Change.query
+                .filter(self.Change.seq > since)
+                .order_by(self.Change.seq)
+                .limit(limit)
+                .all())
+
+    def get_last_change_seq(self):
+        return self.db.session.execute(select(func.max(self.Change.seq))).scalar() or 0
+
+    def compact_changes(self):
+        # A later movie delete implies its reviews are gone, so their
+        # entries only describe rows the cascade has already removed. This
+        # runs first, while every movie delete is still in the log.
+        movie_delete = aliased(self.Change)
+        cascaded = delete(self.Change).where(
+            self.Change.entity == 'review',
+            select(movie_delete.seq).where(
+                movie_delete.entity == 'movie',
+                movie_delete.op == 'delete',
+                movie_delete.entity_id == func.json_extract(self.Change.data, '$.movie_id'),
+                movie_delete.seq > self.Change.seq
+            ).exists()
+        )
+
+        # Keep only the newest entry per entity; it carries the full current
+        # state (or the delete), and ids are never reused, so clients
+        # replaying from any seq converge.
+        latest = (select(func.max(self.Change.seq))
+                  .group_by(self.Change.entity, self.Change.entity_id))
+        superseded = delete(self.Change).where(self.Change.seq.not_in(latest))
+
+        removed = sum(self.db.session.execute(statement).rowcount for statement in (cascaded, superseded))
+        self.db.session.commit()
+        return removed
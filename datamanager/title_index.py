@@ -0,0 +1,285 @@
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+import tempfile
+import unicodedata
+from array import array
+import numpy as np
+
+# Titles are folded to this alphabet before trigrams are taken, so every
+# trigram maps to a slot in a dense table of 37 ** 3 entries.
+ALPHABET = ' abcdefghijklmnopqrstuvwxyz0123456789'
+_CHAR_CODES = {char: code for code, char in enumerate(ALPHABET)}
+_SLOTS = len(ALPHABET) ** 3
+
+_MAGIC = b'MWTIDX02'
+_HEADER = struct.Struct('=8sQQ')  # magic, record count, postings count
+_NON_ALNUM = re.compile(r'[^a-z0-9]+')
+
+# Column order of the tab-separated dump file
+FIELDS = ('title', 'year', 'director', 'imdb_id', 'rating')
+
+
+def normalize_title(title):
+    """Fold a title to lowercase ASCII words separated by single spaces"""
+    title = unicodedata.normalize('NFKD', title).encode('ascii', 'ignore').decode('ascii')
+    return _NON_ALNUM.sub(' ', title.lower()).strip()
+
+
+def title_trigrams(title):
+    """Return the set of trigram slots for a title"""
+    normalized = normalize_title(title)
+    if not normalized:
+        return set()
+    padded = f'  {normalized} '
+    codes = [_CHAR_CODES[char] for char in padded]
+    return {
+        (codes[i] * len(ALPHABET) + codes[i + 1]) * len(ALPHABET) + codes[i + 2]
+        for i in range(len(codes) - 2)
+    }
+
+
+def _iter_dump_lines(dump):
+    """Yield (offset, line) for every data line of a mapped dump file"""
+    offset = 0
+    size = len(dump)
+    while offset < size:
+        end = dump.find(b'\n', offset)
+        if end == -1:
+            end = size
+        line = dump[offset:end].rstrip(b'\r')
+        if line and not line.startswith(b'#'):
+            yield offset, line
+        offset = end + 1
+
+
+def build_index(dump_path, index_path):
+    """
+    Build the binary trigram index for a dump file.
+
+    The dump is a tab-separated file with one movie per line in FIELDS
+    order; blank lines and lines starting with '#' are ignored. Records are
+    numbered by gram count (then dump order), so every posting list is
+    sorted by both record id and title length.
+    """
+    record_offsets = array('Q')
+    gram_counts = array('H')
+    posting_grams = array('I')
+    posting_records = array('I')
+
+    with open(dump_path, 'rb') as dump_file:
+        if os.fstat(dump_file.fileno()).st_size == 0:
+            dump = b''
+        else:
+            dump = mmap.mmap(dump_file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            for offset, line in _iter_dump_lines(dump):
+                title = line.split(b'\t', 1)[0].decode('utf-8', 'replace')
+                grams = title_trigrams(title)
+                record_id = len(record_offsets)
+                record_offsets.append(offset)
+                gram_counts.append(min(len(grams), 0xFFFF))
+                posting_grams.extend(grams)
+                posting_records.extend([record_id] * len(grams))
+        finally:
+            if isinstance(dump, mmap.mmap):
+                dump.close()
+
+    # Renumber records by gram count, keeping dump order within a count
+    order = np.argsort(np.asarray(gram_counts), kind='stable')
+    new_ids = np.empty(len(order), dtype=np.uint64)
+    new_ids[order] = np.arange(len(order), dtype=np.uint64)
+    record_offsets = np.asarray(record_offsets)[order]
+    gram_counts = np.asarray(gram_counts)[order]
+
+    # Sorting (gram, record) keys groups the postings by gram, ids ascending
+    keys = np.asarray(posting_grams).astype(np.uint64) << np.uint64(32)
+    keys |= new_ids[np.asarray(posting_records)]
+    keys.sort()
+    flat_postings = (keys & np.uint64(0xFFFFFFFF)).astype(np.uint32)
+    gram_sizes = np.bincount((keys >> np.uint64(32)).astype(np.int64), minlength=_SLOTS)
+    bounds = np.concatenate([[0], np.cumsum(gram_sizes)]).astype(np.uint64)
+    del keys
+
+    # A private temp file, so concurrent builds never write to the same file
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(index_path) + '.',
+                                    dir=os.path.dirname(os.path.abspath(index_path)))
+    try:
+        with os.fdopen(fd, 'wb') as index_file:
+            index_file.write(_HEADER.pack(_MAGIC, len(record_offsets), len(flat_postings)))
+            bounds.tofile(index_file)
+            record_offsets.tofile(index_file)
+            flat_postings.tofile(index_file)
+            gram_counts.tofile(index_file)
+        os.replace(tmp_path, index_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class TitleIndex:
+    """
+    Read-only fuzzy title index over a local movie metadata dump.
+
+    Both the dump and its trigram index are memory-mapped, so opening an
+    index costs a few syscalls regardless of how many titles it holds.
+    """
+
+    def __init__(self, dump_path, index_path=None):
+        self.dump_path = dump_path
+        self.index_path = index_path or f'{dump_path}.idx'
+        self._dump_file = open(self.dump_path, 'rb')
+        self._index_file = open(self.index_path, 'rb')
+        self._dump = self._map(self._dump_file)
+        self._index = self._map(self._index_file)
+
+        if len(self._index) < _HEADER.size:
+            self.close()
+            raise ValueError(f'{self.index_path} is truncated; rebuild it')
+        magic, record_count, postings_count = _HEADER.unpack_from(self._index, 0)
+        if magic != _MAGIC:
+            self.close()
+            raise ValueError(f'{self.index_path} is not a current title index; rebuild it')
+        expected_size = _HEADER.size + 8 * (_SLOTS + 1) + 10 * record_count + 4 * postings_count
+        if len(self._index) != expected_size:
+            self.close()
+            raise ValueError(f'{self.index_path} is truncated; rebuild it')
+
+        offset = _HEADER.size
+        self._bounds, offset = self._section(offset, np.uint64, _SLOTS + 1)
+        self._record_offsets, offset = self._section(offset, np.uint64, record_count)
+        self._postings, offset = self._section(offset, np.uint32, postings_count)
+        self._gram_counts, offset = self._section(offset, np.uint16, record_count)
+
+    @classmethod
+    def open(cls, dump_path):
+        """
+        Open the prebuilt index for a dump.
+
+        Building is left to `build_index` (or the CLI) so that app workers
+        never race to build it at startup; a missing or stale index raises.
+        """
+        index_path = f'{dump_path}.idx'
+        if not os.path.exists(index_path):
+            raise FileNotFoundError(f'{index_path} does not exist; build it first')
+        if os.path.getmtime(index_path) < os.path.getmtime(dump_path):
+            raise ValueError(f'{index_path} is older than {dump_path}; rebuild it')
+        return cls(dump_path, index_path)
+
+    @staticmethod
+    def _map(file):
+        if os.fstat(file.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _section(self, offset, dtype, count):
+        section = np.frombuffer(self._index, dtype=dtype, count=count, offset=offset)
+        return section, offset + section.nbytes
+
+    def __len__(self):
+        return len(self._record_offsets)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        # The arrays hold exports of the index map, so drop them before closing it
+        for name in ('_bounds', '_record_offsets', '_postings', '_gram_counts'):
+            setattr(self, name, None)
+        for mapped in (self._dump, self._index):
+            if isinstance(mapped, mmap.mmap):
+                mapped.close()
+        self._dump_file.close()
+        self._index_file.close()
+
+    def get_record(self, record_id):
+        """Return the dump fields of a record as a dict"""
+        start = int(self._record_offsets[record_id])
+        end = self._dump.find(b'\n', start)
+        if end == -1:
+            end = len(self._dump)
+        values = self._dump[start:end].rstrip(b'\r').decode('utf-8', 'replace').split('\t')
+        values += [''] * (len(FIELDS) - len(values))
+        return dict(zip(FIELDS, values))
+
+    def _posting(self, gram):
+        return self._postings[self._bounds[gram]:self._bounds[gram + 1]]
+
+    def search(self, title, limit=5, min_score=0.0):
+        """
+        Return up to `limit` (score, record) pairs ranked by trigram
+        (Jaccard) similarity, keeping only those scoring at least `min_score`.
+        """
+        grams = title_trigrams(title)
+        if not grams:
+            return []
+
+        # A record scoring at least min_score shares at least `required`
+        # grams and has between required and len(grams) / min_score grams.
+        # Records are numbered by gram count, so that is one id range.
+        required = max(1, math.ceil(min_score * len(grams) - 1e-9))
+        largest = math.floor(len(grams) / min_score + 1e-9) if min_score > 0 else 0xFFFF
+        # Search with the column's own dtype; a Python int would cast the whole column
+        size_bounds = np.array([min(required, 0xFFFF), min(largest, 0xFFFF)], dtype=self._gram_counts.dtype)
+        lo = int(np.searchsorted(self._gram_counts, size_bounds[0]))
+        hi = int(np.searchsorted(self._gram_counts, size_bounds[1], 'right'))
+        if lo >= hi:
+            return []
+
+        # Count shared grams for every record in the range; each posting
+        # list is sorted by id, so its part in the range is one slice
+        bounds = np.array([lo, hi], dtype=self._postings.dtype)
+        counts = np.zeros(hi - lo, dtype=np.uint16)
+        for gram in grams:
+            posting = self._posting(gram)
+            start, end = np.searchsorted(posting, bounds)
+            counts[posting[start:end] - lo] += 1
+
+        candidates = np.flatnonzero(counts >= required)
+        shared = counts[candidates].astype(np.int64)
+        candidates += lo
+        scores = shared / (len(grams) + self._gram_counts[candidates].astype(np.int64) - shared)
+        keep = scores >= min_score
+        scores, candidates = scores[keep], candidates[keep]
+
+        # Keep everything tied with the limit-th best, then rank exactly:
+        # best score first, ties broken by dump order
+        if len(scores) > limit:
+            cutoff = np.partition(scores, len(scores) - limit)[len(scores) - limit]
+            keep = scores >= cutoff
+            scores, candidates = scores[keep], candidates[keep]
+        top = np.lexsort((self._record_offsets[candidates], -scores))[:limit]
+        return [(float(scores[i]), self.get_record(int(candidates[i]))) for i in top]
+
+    def lookup(self, title, min_score=0.5):
+        """
+        Return the best match in the same shape as an OMDb `t=` response,
+        or None if nothing scores at least `min_score`.
+        """
+        matches = self.search(title, limit=1, min_score=min_score)
+        if not matches:
+            return None
+        record = matches[0][1]
+        return {
+            'Response': 'True',
+            'Title': record['title'],
+            'Year': record['year'] or 'N/A',
+            'Director': record['director'] or 'N/A',
+            'imdbID': record['imdb_id'],
+            'imdbRating': record['rating'] or 'N/A',
+        }
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        sys.exit('usage: python -m datamanager.title_index DUMP_FILE')
+    build_index(sys.argv[1], f'{sys.argv[1]}.idx')
+    with TitleIndex(sys.argv[1]) as built:
+        print(f'Indexed {len(built)} titles into {built.index_path}')
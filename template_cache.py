@@ -0,0 +1,25 @@
+import os
+from jinja2 import FileSystemBytecodeCache
+
+
+def init_template_cache(app):
+    """
+    Keep compiled templates on disk so workers skip Jinja compilation after boot.
+
+    Must run before the app's Jinja environment is first used. Templates
+    are only re-checked for changes when TEMPLATES_AUTO_RELOAD (or, if unset,
+    debug mode) is on, which Flask leaves off in production.
+    """
+    cache_dir = app.config.get('TEMPLATE_CACHE_DIR') or os.path.join(app.instance_path, 'jinja_cache')
+    os.makedirs(cache_dir, exist_ok=True)
+    app.jinja_options = {**app.jinja_options, 'bytecode_cache': FileSystemBytecodeCache(cache_dir)}
+
+    @app.cli.command('precompile-templates')
+    def precompile_templates():
+        """Compile every template into the bytecode cache."""
+        names = app.jinja_env.list_templates()
+        for name in names:
+            app.jinja_env.get_template(name)
+        print(f"Compiled {len(names)} template(s) into {cache_dir}.")
+
+    return cache_dir
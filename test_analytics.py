@@ -0,0 +1,46 @@
+from flask import Flask
+from datamanager.sqlite_data_manager import SQLiteDataManager
+from datamanager.analytics import ReviewAnalytics
+
+app = Flask(__name__)
+app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+# Initialize data manager
+data_manager = SQLiteDataManager(app)
+analytics = ReviewAnalytics(data_manager)
+
+with app.app_context():
+    alice = data_manager.add_user('alice').id
+    bob = data_manager.add_user('bob').id
+    inception = data_manager.add_movie(alice, 'Inception', 'Christopher Nolan', 2010, 8).id
+    alien = data_manager.add_movie(bob, 'Alien', 'Ridley Scott', 1979, 6).id
+
+    # Built from the initial extract
+    stats = analytics.get_stats()
+    print(f"Global stats: {stats}")
+    assert stats['review_count'] == 2
+    assert stats['average_rating'] == 7.0
+
+    # Refreshed incrementally from the change log
+    review = data_manager.add_review(bob, inception, 'Loved it', 10)
+    stats = analytics.get_stats()
+    assert stats['rating_histogram'][10]['count'] == 1
+    assert stats['average_rating_by_director'][0] == {
+        'director': 'Christopher Nolan', 'average_rating': 9.0, 'review_count': 2
+    }
+    assert [row['year'] for row in stats['average_rating_by_year']] == [1979, 2010]
+
+    bob_stats = analytics.get_stats(bob)
+    assert bob_stats['review_count'] == 2
+    assert bob_stats['average_rating'] == 8.0
+
+    data_manager.update_review(review.id, 'Still great', 7)
+    assert analytics.get_stats(bob)['average_rating'] == 6.5
+
+    # Deleting a movie drops its reviews from every scope
+    data_manager.delete_movie(inception)
+    assert analytics.get_stats()['review_count'] == 1
+    assert analytics.get_stats(alice)['review_count'] == 0
+    assert analytics.get_stats(bob)['average_rating_by_director'][0]['director'] == 'Ridley Scott'
+    print("ReviewAnalytics works!")
@@ -0,0 +1,115 @@
+import gzip
+import os
+import tempfile
+import threading
+import zlib
+from flask import Flask, Response, url_for
+from assets import build_assets, init_assets, init_compression
+
+CSS = b'body { color: #333; }\n' * 200
+PNG = b'\x89PNG\r\n\x1a\n' + bytes(range(256))
+PAGE = '<p>' + 'movie ' * 400 + '</p>'
+
+with tempfile.TemporaryDirectory() as static_folder:
+    with open(os.path.join(static_folder, 'styles.css'), 'wb') as file:
+        file.write(CSS)
+    os.makedirs(os.path.join(static_folder, 'img'))
+    with open(os.path.join(static_folder, 'img', 'logo.png'), 'wb') as file:
+        file.write(PNG)
+
+    # Workers starting together must not trip over each other's temp files
+    errors = []
+
+    def build():
+        try:
+            build_assets(static_folder)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=build) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors, errors
+
+    app = Flask(__name__, static_folder=static_folder, static_url_path='/static')
+    manifest = init_assets(app)
+
+    # Only the built files are left behind, no temp files
+    built = {os.path.relpath(os.path.join(root, name), static_folder).replace(os.sep, '/')
+             for root, _, names in os.walk(os.path.join(static_folder, 'dist')) for name in names}
+    assert built == {manifest['styles.css'], manifest['styles.css'] + '.gz',
+                     manifest['img/logo.png'], 'dist/manifest.json'}, built
+
+    init_compression(app)
+
+    @app.route('/page')
+    def page():
+        return PAGE
+
+    @app.route('/small')
+    def small():
+        return '<p>Hi</p>'
+
+    @app.route('/data')
+    def data():
+        return {'titles': ['Heat'] * 500}
+
+    @app.route('/stream')
+    def stream():
+        return Response((f'<p>row {i}</p>' for i in range(3)), mimetype='text/html')
+
+    client = app.test_client()
+
+    # Links point at content-hashed copies
+    with app.test_request_context():
+        css_url = url_for('static', filename='styles.css')
+        png_url = url_for('static', filename='img/logo.png')
+    print(f"Fingerprinted: {css_url}, {png_url}")
+    assert css_url == f"/static/{manifest['styles.css']}"
+    assert css_url.startswith('/static/dist/styles.') and css_url.endswith('.css')
+    assert png_url.startswith('/static/dist/img/logo.')
+
+    # Encoding negotiation for precompressed text assets
+    response = client.get(css_url, headers={'Accept-Encoding': 'gzip, deflate'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.data) == CSS
+    assert 'immutable' in response.headers['Cache-Control']
+    assert 'Accept-Encoding' in response.headers['Vary']
+    response = client.get(css_url, headers={'Accept-Encoding': 'gzip;q=0'})
+    assert 'Content-Encoding' not in response.headers
+    assert response.data == CSS
+    response = client.get(css_url)
+    assert 'Content-Encoding' not in response.headers
+    assert response.mimetype == 'text/css'
+
+    # Binary files are not precompressed; plain names are still served
+    response = client.get(png_url, headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
+    assert response.data == PNG
+    assert client.get('/static/styles.css').data == CSS
+
+    # Only HTML and JSON responses above the size threshold are compressed
+    response = client.get('/page', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.data).decode() == PAGE
+    response = client.get('/data', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    response = client.get('/small', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
+    assert response.data == b'<p>Hi</p>'
+    response = client.get('/page')
+    assert 'Content-Encoding' not in response.headers
+    assert 'Accept-Encoding' in response.headers['Vary']
+
+    # Streamed responses are flushed chunk by chunk
+    response = client.get('/stream', headers={'Accept-Encoding': 'gzip'}, buffered=False)
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Length' not in response.headers
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    chunks = iter(response.response)
+    assert decompressor.decompress(next(chunks)) == b'<p>row 0</p>'
+    assert decompressor.decompress(b''.join(chunks)) == b'<p>row 1</p><p>row 2</p>'
+    response.close()
+    print("Static assets and compression work!")
@@ -0,0 +1,78 @@
+import random
+from flask import Flask
+from datamanager.sqlite_data_manager import SQLiteDataManager
+from datamanager.caching_data_manager import CachingDataManager
+
+app = Flask(__name__)
+app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['QUERY_PROFILING'] = True
+
+# Small budget so eviction is exercised; never sync on reads so hot reads stay SQL-free
+backend = SQLiteDataManager(app)
+data_manager = CachingDataManager(backend, max_records=40, sync_interval=3600)
+
+
+def review_key(review):
+    return review.id, review.user_id, review.movie_id, review.rating, review.comment
+
+
+def assert_matches_backend(user_ids, movie_ids):
+    for user_id in user_ids:
+        cached = sorted(movie.id for movie in data_manager.get_user_movies(user_id))
+        assert cached == sorted(movie.id for movie in backend.get_user_movies(user_id)), user_id
+        cached = sorted(map(review_key, data_manager.get_user_reviews(user_id)))
+        assert cached == sorted(map(review_key, backend.get_user_reviews(user_id))), user_id
+    for movie_id in movie_ids:
+        cached = sorted(map(review_key, data_manager.get_movie_reviews(movie_id)))
+        assert cached == sorted(map(review_key, backend.get_movie_reviews(movie_id))), movie_id
+
+
+with app.app_context():
+    random.seed(7)
+    user_ids = [data_manager.add_user(f'user{i}').id for i in range(5)]
+    movie_ids = [data_manager.add_movie(random.choice(user_ids), f'Movie {i}', None, None, 5).id
+                 for i in range(10)]
+
+    # Random writes through the cache must leave it agreeing with the database
+    for step in range(150):
+        action = random.random()
+        reviews = backend.Review.query.all()
+        if action < 0.45:
+            data_manager.add_review(random.choice(user_ids), random.choice(movie_ids), f'Review {step}', random.randint(1, 10))
+        elif action < 0.7 and reviews:
+            data_manager.update_review(random.choice(reviews).id, f'Edited {step}', random.randint(1, 10))
+        elif action < 0.85 and reviews:
+            data_manager.delete_review(random.choice(reviews).id)
+        elif action < 0.92:
+            movie_ids.append(data_manager.add_movie(random.choice(user_ids), f'Movie {step}', None, None, 5).id)
+        elif len(movie_ids) > 3:
+            deleted = random.sample(movie_ids, 2)
+            data_manager.delete_movies(deleted)
+            movie_ids = [movie_id for movie_id in movie_ids if movie_id not in deleted]
+        assert_matches_backend(random.sample(user_ids, 2), random.sample(movie_ids, 2))
+        assert data_manager._size == sum(map(len, data_manager._partitions.values())) <= data_manager.max_records
+
+    assert_matches_backend(user_ids, movie_ids)
+    print(f"Cached records: {data_manager._size} (budget {data_manager.max_records})")
+
+    # Once a user is hot, reading their movies runs no SQL at all
+    data_manager.get_user_movies(user_ids[0])
+    backend.profiler.reset()
+    data_manager.get_user_movies(user_ids[0])
+    data_manager.get_user_reviews(user_ids[0])
+    assert backend.profiler.report() == []
+
+    # Writes to hot partitions and a growing user table stay within the budget
+    small = CachingDataManager(backend, max_records=20, sync_interval=3600)
+    small.get_user_reviews(user_ids[0])
+    small.get_movie_reviews(movie_ids[0])
+    writers = [small.add_user(f'writer{i}').id for i in range(40)]
+    for step in range(200):
+        small.add_review(writers[step % 40] if step % 2 else user_ids[0], movie_ids[0], f'Hot {step}', 5)
+        assert small._size == sum(map(len, small._partitions.values())) <= small.max_records
+    assert len(small.get_all_users()) == backend.User.query.count()
+    assert [review.author.username for review in small.get_movie_reviews(movie_ids[0])
+            if review.comment == 'Hot 1'] == ['writer1']
+    print(f"Hot-partition writes leave {small._size} cached records (budget {small.max_records})")
+    print("CachingDataManager works!")
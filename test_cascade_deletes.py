@@ -0,0 +1,81 @@
+import os
+import sqlite3
+import tempfile
+from flask import Flask
+from sqlalchemy import inspect, text
+from datamanager.sqlite_data_manager import SQLiteDataManager
+from api import api_bp
+
+# Schema as created before reviews cascaded with their movie and user
+BASELINE_SCHEMA = """
+CREATE TABLE user (id INTEGER NOT NULL, username VARCHAR(80) NOT NULL, PRIMARY KEY (id), UNIQUE (username));
+CREATE TABLE movie (id INTEGER NOT NULL, title VARCHAR(120) NOT NULL, PRIMARY KEY (id));
+CREATE TABLE review (
+    id INTEGER NOT NULL, rating INTEGER NOT NULL, comment TEXT,
+    user_id INTEGER NOT NULL, movie_id INTEGER NOT NULL, PRIMARY KEY (id),
+    FOREIGN KEY(user_id) REFERENCES user (id), FOREIGN KEY(movie_id) REFERENCES movie (id)
+);
+INSERT INTO user (id, username) VALUES (1, 'alice'), (2, 'bob');
+INSERT INTO movie (id, title) VALUES (1, 'Alien'), (2, 'Heat');
+INSERT INTO review (id, rating, comment, user_id, movie_id) VALUES (1, 8, '', 1, 1), (2, 6, 'Tense', 2, 1), (3, 7, '', 1, 2);
+"""
+
+with tempfile.TemporaryDirectory() as tmp_dir:
+    db_path = os.path.join(tmp_dir, 'movieweb.db')
+    with sqlite3.connect(db_path) as connection:
+        connection.executescript(BASELINE_SCHEMA)
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+    # Initialize data manager; tables are rebuilt with cascading foreign keys and AUTOINCREMENT ids
+    data_manager = SQLiteDataManager(app)
+    app.config['data_manager'] = data_manager
+    app.register_blueprint(api_bp, url_prefix='/api')
+
+    with app.app_context():
+        foreign_keys = inspect(data_manager.db.engine).get_foreign_keys('review')
+        print(f"Review foreign keys: {foreign_keys}")
+        assert all(fk['options'].get('ondelete') == 'CASCADE' for fk in foreign_keys)
+        assert [review.id for review in data_manager.Review.query.order_by('id')] == [1, 2, 3]
+        for table in ('user', 'movie', 'review'):
+            schema = data_manager.db.session.execute(
+                text("SELECT sql FROM sqlite_master WHERE name = :name"), {'name': table}).scalar()
+            assert 'AUTOINCREMENT' in schema, schema
+
+        # Deleting a reviewed movie takes every user's reviews of it along
+        assert data_manager.delete_movie(1)
+        assert [review.id for review in data_manager.Review.query.all()] == [3]
+        assert not data_manager.delete_movie(1)
+
+        # Only the listed movies that are in the user's library are deleted
+        alice, bob = 1, 2
+        drive = data_manager.add_movie(alice, 'Drive', 'Nicolas Winding Refn', 2011, 8).id
+        fargo = data_manager.add_movie(alice, 'Fargo', 'Joel Coen', 1996, 9).id
+        zodiac = data_manager.add_movie(bob, 'Zodiac', 'David Fincher', 2007, 8).id
+        data_manager.add_review(bob, drive, 'Great score', 9)
+        assert data_manager.delete_user_movies(alice, [drive, zodiac]) == 1
+        assert data_manager.get_movie_reviews(drive) == []
+        assert data_manager.delete_user_movies(alice, []) == 0
+
+        # Without ids the whole library goes
+        assert data_manager.delete_user_movies(alice) == 2
+        assert data_manager.get_user_movies(alice) == []
+        assert [movie.id for movie in data_manager.get_user_movies(bob)] == [zodiac]
+
+    client = app.test_client()
+    response = client.delete(f'/api/users/{bob}/movies?ids=1,two')
+    assert response.status_code == 400, response.get_json()
+    assert client.delete('/api/users/99/movies').status_code == 404
+    response = client.delete(f'/api/users/{bob}/movies?ids={zodiac}')
+    assert response.status_code == 200
+    assert response.get_json()['data'] == {'deleted': 1}
+
+    # A single movie is deleted only from the library of a user who reviewed it
+    with app.app_context():
+        heat = data_manager.add_movie(bob, 'Heat', 'Michael Mann', 1995, 7).id
+    assert client.delete(f'/api/users/{alice}/movies/{heat}').status_code == 404
+    assert client.delete(f'/api/users/{bob}/movies/{heat}').status_code == 200
+    assert client.delete(f'/api/users/{bob}/movies/{heat}').status_code == 404
+    print("Cascading movie deletes work!")
@@ -0,0 +1,107 @@
+from flask import Flask
+from datamanager.sqlite_data_manager import SQLiteDataManager
+from api import api_bp
+
+app = Flask(__name__)
+app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+# Initialize data manager and the API that serves the feed
+data_manager = SQLiteDataManager(app)
+app.config['data_manager'] = data_manager
+app.register_blueprint(api_bp, url_prefix='/api')
+client = app.test_client()
+
+
+def replay(changes):
+    """Apply a change feed to an empty copy, the way a client would"""
+    state = {'user': {}, 'movie': {}, 'review': {}}
+    for change in changes:
+        if change['data'] is not None:
+            state[change['entity']][change['entity_id']] = change['data']
+            continue
+        state[change['entity']].pop(change['entity_id'], None)
+        if change['entity'] == 'movie':
+            # Reviews go with their movie
+            state['review'] = {review_id: review for review_id, review in state['review'].items()
+                               if review['movie_id'] != change['entity_id']}
+    return {entity: sorted(rows) for entity, rows in state.items()}
+
+
+def snapshot():
+    with app.app_context():
+        return {
+            'user': sorted(user.id for user in data_manager.User.query.all()),
+            'movie': sorted(movie.id for movie in data_manager.Movie.query.all()),
+            'review': sorted(review.id for review in data_manager.Review.query.all())
+        }
+
+
+def fetch_all(limit, since=0):
+    changes, pages = [], 0
+    while True:
+        page = client.get(f'/api/changes?since={since}&limit={limit}').get_json()['data']
+        changes += page['changes']
+        since = page['next_since']
+        pages += 1
+        if not page['has_more']:
+            return changes, pages
+
+
+with app.app_context():
+    alice = data_manager.add_user('alice').id
+    bob = data_manager.add_user('bob').id
+    alien = data_manager.add_movie(alice, 'Alien', 'Ridley Scott', 1979, 8).id
+    heat = data_manager.add_movie(alice, 'Heat', 'Michael Mann', 1995, 7).id
+    data_manager.update_movie(alien, 'Alien', 'Ridley Scott', 1979, 8)
+    data_manager.add_review(bob, alien, 'Tense', 9)
+    review = data_manager.add_review(bob, heat, 'Long', 6)
+    data_manager.update_review(review.id, 'Long but great', 8)
+    data_manager.delete_movie(alien)
+
+current = snapshot()
+
+# Paging walks the whole log in order and stops once has_more is false
+changes, pages = fetch_all(limit=3)
+seqs = [change['seq'] for change in changes]
+print(f"Fetched {len(changes)} changes in {pages} pages")
+assert seqs == sorted(seqs) and len(seqs) == len(set(seqs)) == 11
+assert pages == 4
+assert replay(changes) == current
+
+response = client.get(f'/api/changes?since={seqs[-1]}').get_json()['data']
+assert response == {'changes': [], 'next_since': seqs[-1], 'has_more': False}
+
+for query in ('since=-1', 'limit=0', 'limit=ten', 'since=1.5'):
+    assert client.get(f'/api/changes?{query}').status_code == 400, query
+
+# Compaction keeps one entry per live entity and drops the reviews of deleted movies
+with app.app_context():
+    removed = data_manager.compact_changes()
+print(f"Compaction removed {removed} changes")
+compacted, _ = fetch_all(limit=100)
+assert removed == 5
+assert sorted((change['entity'], change['op']) for change in compacted) == [
+    ('movie', 'delete'), ('movie', 'insert'), ('review', 'insert'), ('review', 'update'),
+    ('user', 'insert'), ('user', 'insert')
+]
+assert replay(compacted) == current
+
+# A client that already saw some of the removed entries converges too
+assert replay(changes[:7] + [change for change in compacted if change['seq'] > changes[6]['seq']]) == current
+
+# Ids are never reused, so a new movie cannot inherit the reviews of a deleted one
+with app.app_context():
+    drive = data_manager.add_movie(alice, 'Drive', 'Nicolas Winding Refn', 2011, 8).id
+    data_manager.add_review(bob, drive, 'Great score', 9)
+seen = compacted + fetch_all(limit=100, since=compacted[-1]['seq'])[0]
+with app.app_context():
+    data_manager.delete_movie(drive)
+    fargo = data_manager.add_movie(alice, 'Fargo', 'Joel Coen', 1996, 9).id
+    data_manager.compact_changes()
+assert fargo != drive
+current = snapshot()
+compacted, _ = fetch_all(limit=100)
+assert replay(compacted) == current
+assert replay(seen + [change for change in compacted if change['seq'] > seen[-1]['seq']]) == current
+print("Change feed works!")
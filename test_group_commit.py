@@ -0,0 +1,60 @@
+import os
+import tempfile
+import threading
+from flask import Flask
+from datamanager.sqlite_data_manager import SQLiteDataManager
+
+with tempfile.TemporaryDirectory() as tmp_dir:
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(tmp_dir, 'group_commit.db')}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['GROUP_COMMIT'] = True
+    app.config['GROUP_COMMIT_MAX_DELAY'] = 0.02
+
+    # Initialize data manager with a group commit writer thread
+    data_manager = SQLiteDataManager(app)
+
+    with app.app_context():
+        # Returned objects belong to the caller's session, relationships included
+        user = data_manager.add_user('alice')
+        movie = data_manager.add_movie(user.id, 'Heat', 'Michael Mann', 1995, 8)
+        print(f"Added {movie.title} with reviews {movie.reviews}")
+        assert [review.user_id for review in movie.reviews] == [user.id]
+        assert data_manager.User.query.get(user.id) is user
+
+        # Objects already loaded in the caller's session see the committed write
+        assert data_manager.Movie.query.get(movie.id).title == 'Heat'
+        updated = data_manager.update_movie(movie.id, 'Heat (1995)', 'Michael Mann', 1995, 8)
+        assert updated is movie
+        assert data_manager.Movie.query.get(movie.id).title == 'Heat (1995)'
+        review = data_manager.add_review(user.id, movie.id, 'Great shootout', 9)
+        assert review.movie is movie
+        assert len(movie.reviews) == 2
+
+    # Concurrent writers share batches; a failing write only fails its own caller
+    results, errors = [], []
+
+    def worker(username):
+        with app.app_context():
+            try:
+                results.append(data_manager.add_user(username).id)
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(f'user{i}',)) for i in range(20)]
+    threads.append(threading.Thread(target=worker, args=('alice',)))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print(f"Concurrent writes: {len(results)} committed, {len(errors)} failed")
+    assert len(set(results)) == 20
+    assert len(errors) == 1 and 'UNIQUE' in str(errors[0])
+
+    with app.app_context():
+        assert data_manager.User.query.count() == 21
+
+    data_manager.group_commit.close()
+    with app.app_context():
+        data_manager.db.engine.dispose()
+    print("Group commit works!")
@@ -0,0 +1,43 @@
+import os
+import tempfile
+
+with tempfile.TemporaryDirectory() as tmp_dir:
+    # The app reads these at import time
+    os.environ['HOT_TIER'] = '1'
+    os.environ['DATABASE_URI'] = f"sqlite:///{os.path.join(tmp_dir, 'hot_tier.db')}"
+    import app as movieweb
+    del os.environ['HOT_TIER'], os.environ['DATABASE_URI']
+    from datamanager.caching_data_manager import CachingDataManager
+
+    data_manager = movieweb.data_manager
+    assert isinstance(data_manager, CachingDataManager)
+    client = movieweb.app.test_client()
+
+    with movieweb.app.app_context():
+        alice = data_manager.add_user('alice').id
+        bob = data_manager.add_user('bob').id
+        heat = data_manager.add_movie(alice, 'Heat', 'Michael Mann', 1995, 8).id
+        review = data_manager.add_review(bob, heat, 'Great shootout', 9).id
+
+    # Pages render reviews served from the cache, including their author and movie
+    response = client.get(f'/users/{alice}/movies/{heat}')
+    assert response.status_code == 200, response.status_code
+    assert b'bob' in response.data
+    assert client.get(f'/reviews/{review}/update').status_code == 200
+    assert client.get(f'/users/{alice}').status_code == 200
+
+    with movieweb.app.app_context():
+        cached = data_manager.get_review(review)
+        assert cached.author.username == 'bob'
+        assert cached.movie.title == 'Heat'
+
+    # Writes through the routes show up on the next render
+    response = client.post(f'/reviews/{review}/update', data={'text': 'Still great', 'rating': '7'})
+    assert response.status_code == 302
+    with movieweb.app.app_context():
+        assert data_manager.get_review(review).rating == 7
+    assert client.get(f'/users/{alice}/movies/{heat}').status_code == 200
+
+    with movieweb.app.app_context():
+        data_manager.db.engine.dispose()
+    print("Hot tier routes work!")
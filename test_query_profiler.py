@@ -0,0 +1,46 @@
+from flask import Flask
+from datamanager.sqlite_data_manager import SQLiteDataManager
+
+app = Flask(__name__)
+app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['QUERY_PROFILING'] = True
+
+# Initialize data manager
+data_manager = SQLiteDataManager(app)
+
+with app.app_context():
+    user = data_manager.add_user('profiled')
+    movie = data_manager.add_movie(user.id, 'The Matrix', None, None, 8)
+    for _ in range(3):
+        data_manager.get_movie_reviews(movie.id)
+
+    report = data_manager.profiler.report(order_by='count', limit=0)
+    reviews_lookup = next(row for row in report
+                          if row['statement'].startswith('SELECT review.')
+                          and 'review.movie_id = ?' in row['statement'])
+    print(f"Review lookup by movie: {reviews_lookup}")
+
+    # review.movie_id has no index, so the plan should flag a full scan
+    assert reviews_lookup['count'] == 3
+    assert reviews_lookup['full_scans'] == ['review']
+
+    # Failed statements leave nothing behind on the connection
+    for _ in range(5):
+        try:
+            data_manager.add_user('profiled')
+        except Exception:
+            pass
+    assert not data_manager.db.session.connection().info
+    assert data_manager.profiler.report(order_by='count', limit=0)[0]['count'] >= 3
+
+    # A negative limit is rejected instead of silently dropping the last rows
+    try:
+        data_manager.profiler.report(limit=-1)
+        assert False, "expected a negative limit to raise"
+    except ValueError:
+        pass
+
+    data_manager.profiler.reset()
+    assert data_manager.profiler.report() == []
+    print("Query profiler works!")
@@ -0,0 +1,63 @@
+import os
+import tempfile
+from datamanager.title_index import TitleIndex, build_index
+
+DUMP = """The Matrix\t1999\tLana Wachowski, Lilly Wachowski\ttt0133093\t8.7
+The Matrix Reloaded\t2003\tLana Wachowski, Lilly Wachowski\ttt0234215\t7.2
+Amélie\t2001\tJean-Pierre Jeunet\ttt0211915\t8.3
+Inception\t2010\tChristopher Nolan\ttt1375666\t8.8
+"""
+
+with tempfile.TemporaryDirectory() as tmp_dir:
+    dump_path = os.path.join(tmp_dir, 'movies.tsv')
+    with open(dump_path, 'w', encoding='utf-8') as dump_file:
+        dump_file.write(DUMP)
+
+    # The index is never built implicitly
+    try:
+        TitleIndex.open(dump_path)
+        assert False, "expected a missing index to raise"
+    except FileNotFoundError:
+        pass
+    build_index(dump_path, f'{dump_path}.idx')
+
+    with TitleIndex.open(dump_path) as index:
+        print(f"Indexed titles: {len(index)}")
+
+        # Typos and missing accents still resolve to the right title
+        movie = index.lookup('the matrx')
+        print(f"Lookup 'the matrx': {movie}")
+        assert movie['Title'] == 'The Matrix'
+        assert movie['imdbID'] == 'tt0133093'
+        assert index.lookup('amelie')['Title'] == 'Amélie'
+
+        # Closer matches rank first
+        ranked = [record['title'] for _, record in index.search('matrix reloaded')]
+        assert ranked[:2] == ['The Matrix Reloaded', 'The Matrix']
+
+        # Unrelated titles fall through to OMDb
+        assert index.lookup('Casablanca') is None
+
+    # Many longer titles containing the query must not crowd out the exact match
+    crowded_path = os.path.join(tmp_dir, 'crowded.tsv')
+    with open(crowded_path, 'w', encoding='utf-8') as dump_file:
+        for part in range(1, 31):
+            dump_file.write(f"The Matrix Documentary Part {part} Extended\t2020\t\t\t\n")
+        dump_file.write("The Matrix\t1999\tLana Wachowski, Lilly Wachowski\ttt0133093\t8.7\n")
+    build_index(crowded_path, f'{crowded_path}.idx')
+    with TitleIndex.open(crowded_path) as index:
+        assert index.lookup('The Matrix')['imdbID'] == 'tt0133093'
+        assert index.search('The Matrix', limit=1)[0][1]['title'] == 'The Matrix'
+
+    # Empty or truncated index files raise ValueError, so the app falls back to OMDb
+    with open(f'{crowded_path}.idx', 'rb') as index_file:
+        built = index_file.read()
+    for size in (0, 10, len(built) - 2):
+        with open(f'{crowded_path}.idx', 'wb') as index_file:
+            index_file.write(built[:size])
+        try:
+            TitleIndex.open(crowded_path)
+            assert False, f"expected a {size}-byte index to raise"
+        except ValueError:
+            pass
+    print("TitleIndex lookup works!")